@@ -5,7 +5,7 @@ Orchestrates all modules to implement the complete automation workflow.
 
 import logging
 import asyncio
-from typing import Optional
+from typing import List, Optional
 from telethon import TelegramClient
 from telethon.tl.types import Message
 
@@ -55,6 +55,10 @@ class BotAutomation:
         # Step 2 button configuration
         self.step2_button_keywords = step2_button_keywords
         self.step2_button_index = step2_button_index
+        # Parsed once here instead of on every Step 2 lookup
+        self.step2_keywords: List[str] = [
+            k.strip() for k in (step2_button_keywords or '').split(',') if k.strip()
+        ]
 
         # Initialize all modules
         self.button_cache = ButtonCache(max_messages=Config.MAX_CACHED_MESSAGES)
@@ -316,13 +320,12 @@ class BotAutomation:
             button = None
 
             # Try keywords first if configured
-            if self.step2_button_keywords:
-                keywords = [k.strip() for k in self.step2_button_keywords.split(',') if k.strip()]
-                if keywords:
-                    logger.info(f"🔍 Step 2: Searching for button with keywords: {keywords}")
-                    button = self.button_analyzer.find_button_by_keywords(msg_data.buttons, keywords)
-                    if button:
-                        logger.info(f"✓ Found Step 2 button by keywords: '{button.text}'")
+            keywords = self.step2_keywords
+            if keywords:
+                logger.info(f"🔍 Step 2: Searching for button with keywords: {keywords}")
+                button = self.button_analyzer.find_button_by_keywords(msg_data.buttons, keywords)
+                if button:
+                    logger.info(f"✓ Found Step 2 button by keywords: '{button.text}'")
 
             # Fallback to index-based selection
             if not button:
@@ -5,7 +5,8 @@ Optimized Bot Automation - Telethon + Fast Modules
 
 import asyncio
 import logging
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import Optional, List, Set, Tuple
 from time import monotonic
 
 from telethon import TelegramClient
@@ -20,6 +21,19 @@ from modules.state_machine import StateMachine, AutomationState
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class StatusSnapshot:
+    """Flat view of the counters shown in periodic status updates."""
+    state: str
+    total_messages: int
+    total_edits: int
+    triggers: int
+    clicks: int
+    successful: int
+    failed: int
+    avg_cycle_ms: float
+
+
 class BotAutomationFast:
     """
     Optimized bot automation using Telethon + fast modules.
@@ -42,6 +56,10 @@ class BotAutomationFast:
         # Step 2 configuration
         self.step2_button_keywords = step2_button_keywords
         self.step2_button_index = step2_button_index
+        # Parsed once here instead of on every Step 2 lookup
+        self.step2_keywords: List[str] = [
+            k.strip() for k in (step2_button_keywords or '').split(',') if k.strip()
+        ]
 
         # Initialize FAST modules
         self.button_cache = FastButtonCache(max_size=Config.MAX_CACHED_MESSAGES)
@@ -76,7 +94,9 @@ class BotAutomationFast:
         # Control flags
         self.is_running = False
         self.current_message_id: Optional[int] = None
-        self.last_button_texts: Optional[List[str]] = None
+        self.last_button_texts: Optional[Tuple[str, ...]] = None
+        # Messages with a stabilization check already waiting out its debounce
+        self._pending_checks: Set[int] = set()
 
         # Performance metrics
         self._metrics = {
@@ -84,6 +104,7 @@ class BotAutomationFast:
             'successful_cycles': 0,
             'failed_cycles': 0,
             'total_clicks': 0,
+            'coalesced_checks': 0,
             'avg_cycle_time': 0.0
         }
 
@@ -212,9 +233,15 @@ class BotAutomationFast:
             self.stabilization_detector.record_edit(message.id)
             logger.debug(f"Message edit detected: {message.id}")
 
-            # If we're waiting on this message, check if we should proceed
+            # If we're waiting on this message, check if we should proceed.
+            # A check still in its debounce reads the latest cache state
+            # anyway, so edits arriving meanwhile don't need a task of their own
             if self.state_machine.is_active():
-                asyncio.create_task(self._check_stabilization(message.id))
+                if message.id in self._pending_checks:
+                    self._metrics['coalesced_checks'] += 1
+                else:
+                    self._pending_checks.add(message.id)
+                    asyncio.create_task(self._check_stabilization(message.id))
 
     async def _execute_step_1(self, message_id: int, cycle_start: float) -> None:
         """Execute Step 1: Click "Список прямых перевозок"."""
@@ -342,10 +369,9 @@ class BotAutomationFast:
             button = None
 
             # Try keywords first if configured
-            if self.step2_button_keywords:
-                keywords = [k.strip() for k in self.step2_button_keywords.split(',') if k.strip()]
-                if keywords:
-                    button = self.button_analyzer.find_button_by_keywords(msg_data.buttons, keywords)
+            keywords = self.step2_keywords
+            if keywords:
+                button = self.button_analyzer.find_button_by_keywords(msg_data.buttons, keywords)
 
             # Fallback to index-based selection
             if not button:
@@ -432,83 +458,91 @@ class BotAutomationFast:
 
     async def _check_stabilization(self, message_id: int) -> None:
         """Check if message has stabilized and proceed to next step."""
-        # Only proceed if we're in an active state
-        if not self.state_machine.is_active():
+        try:
+            state = await self._debounce(message_id)
+        finally:
+            self._pending_checks.discard(message_id)
+
+        if state is None:
             return
 
-        # Get message data
         msg_data = self.button_cache.get_message(message_id)
+        if not msg_data or not msg_data.buttons:
+            return
 
-        # Check if this message has buttons (response to our click)
-        if msg_data and msg_data.buttons:
-            # For STEP_1: Accept message with buttons (list response)
-            if self.state_machine.current_state == AutomationState.STEP_1:
-                await asyncio.sleep(0.02)  # 20ms debounce
+        # For STEP_1: Accept message with buttons (list response)
+        if state == AutomationState.STEP_1:
+            current_button_texts = self.button_analyzer.get_button_texts(msg_data.buttons)
 
-                if self.state_machine.current_state != AutomationState.STEP_1:
-                    return
+            if self.last_button_texts and current_button_texts == self.last_button_texts:
+                return
 
-                msg_data = self.button_cache.get_message(message_id)
-                if msg_data and msg_data.buttons:
-                    current_button_texts = self.button_analyzer.get_button_texts(msg_data.buttons)
+            logger.info(f"Step 1 response detected in message {message_id} with {len(msg_data.buttons)} buttons")
+            self.current_message_id = message_id
+            self.last_button_texts = current_button_texts
+            self.state_machine.complete_step_1(message_id)
 
-                    if self.last_button_texts and current_button_texts == self.last_button_texts:
-                        return
+            if self.mode == 'list_only':
+                logger.info("Mode is 'list_only' - completing automation after Step 1")
+                self.state_machine.complete_automation()
+                await asyncio.sleep(0.05)
+                self.state_machine.reset()
+            else:
+                await self._execute_step_2(message_id)
 
-                    logger.info(f"Step 1 response detected in message {message_id} with {len(msg_data.buttons)} buttons")
-                    self.current_message_id = message_id
-                    self.last_button_texts = current_button_texts
-                    self.state_machine.complete_step_1(message_id)
+        # For STEP_2: Accept same message with confirmation buttons
+        elif state == AutomationState.STEP_2:
+            current_button_texts = self.button_analyzer.get_button_texts(msg_data.buttons)
 
-                    if self.mode == 'list_only':
-                        logger.info("Mode is 'list_only' - completing automation after Step 1")
-                        self.state_machine.complete_automation()
-                        await asyncio.sleep(0.05)
-                        self.state_machine.reset()
-                    else:
-                        await self._execute_step_2(message_id)
+            if self.last_button_texts and current_button_texts == self.last_button_texts:
+                return
 
-            # For STEP_2: Accept same message with confirmation buttons
-            elif self.state_machine.current_state == AutomationState.STEP_2:
-                await asyncio.sleep(0.02)  # 20ms debounce
+            button_texts_lower = [text.lower() for text in current_button_texts]
+            has_confirm = any('подтверд' in text for text in button_texts_lower)
 
-                if self.state_machine.current_state != AutomationState.STEP_2:
-                    return
+            if has_confirm:
+                logger.info(f"Step 2 response detected in message {message_id} with confirmation buttons")
+                self.current_message_id = message_id
+                self.last_button_texts = current_button_texts
+                self.state_machine.complete_step_2(message_id)
+                await self._execute_step_3(message_id, 0)
 
-                msg_data = self.button_cache.get_message(message_id)
-                if msg_data and msg_data.buttons:
-                    current_button_texts = self.button_analyzer.get_button_texts(msg_data.buttons)
+        # For STEP_3: Check for reservation success message
+        elif state == AutomationState.STEP_3:
+            text_lower = msg_data.text.lower() if msg_data.text else ""
 
-                    if self.last_button_texts and current_button_texts == self.last_button_texts:
-                        return
+            if 'успешно зарезервирована' in text_lower or 'перевозка успешно' in text_lower:
+                logger.info(f"✅ Step 3 SUCCESS: Reservation confirmed in message {message_id}")
+                self.state_machine.complete_automation()
+                await asyncio.sleep(0.1)
+                self.state_machine.reset()
+                logger.info("🏁 Automation completed successfully - returned to IDLE")
 
-                    button_texts_lower = [text.lower() for text in current_button_texts]
-                    has_confirm = any('подтверд' in text for text in button_texts_lower)
+    async def _debounce(self, message_id: int) -> Optional[AutomationState]:
+        """
+        Wait out the 20ms edit debounce for a message.
 
-                    if has_confirm:
-                        logger.info(f"Step 2 response detected in message {message_id} with confirmation buttons")
-                        self.current_message_id = message_id
-                        self.last_button_texts = current_button_texts
-                        self.state_machine.complete_step_2(message_id)
-                        await self._execute_step_3(message_id, 0)
+        Returns:
+            The step to handle, or None if the message has no buttons yet or
+            the state machine moved on while waiting
+        """
+        # Only proceed if we're in an active state
+        if not self.state_machine.is_active():
+            return None
 
-            # For STEP_3: Check for reservation success message
-            elif self.state_machine.current_state == AutomationState.STEP_3:
-                await asyncio.sleep(0.02)  # 20ms debounce
+        msg_data = self.button_cache.get_message(message_id)
+        if not msg_data or not msg_data.buttons:
+            return None
 
-                if self.state_machine.current_state != AutomationState.STEP_3:
-                    return
+        state = self.state_machine.current_state
+        if state not in (AutomationState.STEP_1, AutomationState.STEP_2, AutomationState.STEP_3):
+            return None
 
-                msg_data = self.button_cache.get_message(message_id)
-                if msg_data:
-                    text_lower = msg_data.text.lower() if msg_data.text else ""
+        await asyncio.sleep(0.02)  # 20ms debounce
 
-                    if 'успешно зарезервирована' in text_lower or 'перевозка успешно' in text_lower:
-                        logger.info(f"✅ Step 3 SUCCESS: Reservation confirmed in message {message_id}")
-                        self.state_machine.complete_automation()
-                        await asyncio.sleep(0.1)
-                        self.state_machine.reset()
-                        logger.info("🏁 Automation completed successfully - returned to IDLE")
+        if self.state_machine.current_state != state:
+            return None
+        return state
 
     async def _timeout_checker(self) -> None:
         """Periodically check for state timeouts."""
@@ -545,10 +579,25 @@ class BotAutomationFast:
             'message_monitor': self.message_monitor.get_statistics(),
             'click_executor': self.click_executor.get_statistics(),
             'stabilization_detector': self.stabilization_detector.get_statistics(),
-            'metrics': self._metrics,
+            'metrics': dict(self._metrics),
             'cache': self.button_cache.get_statistics()
         }
 
+    def get_status_snapshot(self) -> StatusSnapshot:
+        """Get the status counters without building the nested dicts."""
+        monitor = self.message_monitor
+        executor = self.click_executor
+        return StatusSnapshot(
+            state=self.state_machine.current_state.name,
+            total_messages=monitor.total_messages,
+            total_edits=monitor.total_edits,
+            triggers=monitor.triggers_detected,
+            clicks=executor.total_clicks,
+            successful=executor.successful_clicks,
+            failed=executor.failed_clicks,
+            avg_cycle_ms=self._metrics['avg_cycle_time'] * 1000,
+        )
+
     def print_status(self) -> None:
         """Print current status to console."""
         status = self.get_status()
@@ -5,7 +5,7 @@ Uses pytdbot for native TDLib speed with optimized modules
 
 import asyncio
 import logging
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from time import monotonic
 
 from pytdbot import Client, types, filters
@@ -51,6 +51,10 @@ class BotAutomationTDLib:
         # Step 2 configuration
         self.step2_button_keywords = step2_button_keywords
         self.step2_button_index = step2_button_index
+        # Parsed once here instead of on every Step 2 lookup
+        self.step2_keywords: List[str] = [
+            k.strip() for k in (step2_button_keywords or '').split(',') if k.strip()
+        ]
 
         # Initialize optimized modules
         self.button_cache = FastButtonCache(max_messages=Config.MAX_CACHED_MESSAGES)
@@ -68,7 +72,7 @@ class BotAutomationTDLib:
         # State tracking
         self.is_running = False
         self.current_message_id: Optional[int] = None
-        self.last_button_texts: Optional[List[str]] = None
+        self.last_button_texts: Optional[Tuple[str, ...]] = None
 
         # Performance metrics
         self._metrics = {
@@ -347,10 +351,9 @@ class BotAutomationTDLib:
             button = None
 
             # Try keywords first
-            if self.step2_button_keywords:
-                keywords = [k.strip() for k in self.step2_button_keywords.split(',') if k.strip()]
-                if keywords:
-                    button = self.button_analyzer.find_button_by_keywords(msg_data.buttons, keywords)
+            keywords = self.step2_keywords
+            if keywords:
+                button = self.button_analyzer.find_button_by_keywords(msg_data.buttons, keywords)
 
             # Fallback to index
             if not button:
@@ -580,7 +583,7 @@ class BotAutomationTDLib:
         return {
             'running': self.is_running,
             'state': self.state_machine.current_state.name,
-            'metrics': self._metrics,
+            'metrics': dict(self._metrics),
             'cache': self.button_cache.get_statistics(),
             'stabilization': self.stabilization_detector.get_statistics()
         }
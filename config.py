@@ -3,6 +3,7 @@ Configuration module for Telegram bot automation system.
 Contains all configurable parameters for the automation.
 """
 
+import functools
 import os
 from typing import List
 from dotenv import load_dotenv
@@ -14,8 +15,8 @@ load_dotenv()
 class Config:
     """Main configuration class for the automation system."""
 
-    # Telegram API credentials
-    API_ID = os.getenv('API_ID')
+    # Telegram API credentials (resolved once at import)
+    API_ID = int(os.getenv('API_ID') or 0)
     API_HASH = os.getenv('API_HASH')
     PHONE = os.getenv('PHONE')
     SESSION_NAME = os.getenv('SESSION_NAME', 'telegram_bot_automation')
@@ -70,8 +71,9 @@ class Config:
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
     @classmethod
+    @functools.cache
     def validate(cls) -> bool:
-        """Validate that all required configuration is present."""
+        """Validate that all required configuration is present (checked once)."""
         required_fields = ['API_ID', 'API_HASH', 'PHONE', 'BOT_USERNAME']
         missing = []
 
@@ -3,17 +3,25 @@ Telegram Control Bot for managing automation sessions.
 Enhanced version with full session and bot management.
 """
 import os
+import re
 import logging
 import asyncio
+import functools
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, Set
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
+from telegram.helpers import escape_markdown
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
     MessageHandler,
+    TypeHandler,
     filters,
     ConversationHandler
 )
@@ -63,9 +71,111 @@ logger = logging.getLogger(__name__)
 ) = range(13, 16)
 
 
+# Per-user conversation state kept in ControlBot.temp_data
+
+@dataclass(slots=True)
+class AddSessionState:
+    phone: str = ""
+    api_id: int = 0
+    api_hash: str = ""
+    session_id: int = 0
+
+
+@dataclass(slots=True)
+class AddBotState:
+    session_id: int = 0
+    bot_username: str = ""
+    mode: str = ""
+    step2_keywords: Optional[str] = None
+    step2_index: int = 0
+
+
+@dataclass(slots=True)
+class ConfigStep2State:
+    bot_id: int = 0
+
+
+@dataclass(slots=True)
+class ReauthState:
+    session_id: int = 0
+
+
+# Static keyboards, built once (markups are immutable and safe to share)
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Статус", callback_data="main_status")],
+    [InlineKeyboardButton("📱 Сессии", callback_data="main_sessions")],
+    [InlineKeyboardButton("🤖 Боты", callback_data="main_bots")],
+    [InlineKeyboardButton("💚 Проверка здоровья", callback_data="main_health")]
+])
+
+ADD_BOT_MODE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Полный цикл (3 кнопки)", callback_data="addbot_mode_full")],
+    [InlineKeyboardButton("📋 Только список (1 кнопка)", callback_data="addbot_mode_list")]
+])
+
+ADD_BOT_STEP2_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔢 По номеру кнопки (1-я, 2-я, ...)", callback_data="addbot_step2_index")],
+    [InlineKeyboardButton("🔤 По ключевым словам", callback_data="addbot_step2_keywords")],
+    [InlineKeyboardButton("⏩ Пропустить (1-я кнопка)", callback_data="addbot_step2_skip")]
+])
+
+# Callback data prefixes of conversation steps (the suffix is the choice)
+_PREFIX_ADDBOT_MODE = "addbot_mode_"
+_PREFIX_ADDBOT_STEP2 = "addbot_step2_"
+_PREFIX_CONFIG_STEP2 = "config_step2_"
+
+# Conversation callback patterns (ASCII-only callback data)
+_P_ADD_SESSION_START = re.compile(r"^add_session_start$", re.ASCII)
+_P_ADD_BOT_START = re.compile(r"^add_bot_start:\d+$", re.ASCII)
+_P_ADDBOT_MODE = re.compile(r"^addbot_mode_(full|list)$", re.ASCII)
+_P_ADDBOT_STEP2 = re.compile(r"^addbot_step2_(index|keywords|skip)$", re.ASCII)
+_P_CONFIG_STEP2_START = re.compile(r"^config_step2_start:\d+$", re.ASCII)
+_P_CONFIG_STEP2_METHOD = re.compile(r"^config_step2_(index|keywords)$", re.ASCII)
+_P_SESSION_REAUTH = re.compile(r"^session_reauth:\d+$", re.ASCII)
+
+# Abandoned conversations are ended (and their temp_data freed) after this many seconds
+CONVERSATION_TIMEOUT = 600
+
+# Upper bound for Telethon calls made while a user's conversation lock is held (seconds)
+TELETHON_TIMEOUT = 45
+TIMEOUT_TEXT = "❌ Тайм-аут запроса. Попробуйте снова."
+
+# Session/bot rows read by handlers are reused for this many seconds
+ROW_CACHE_TTL = 30.0
+
+# Idle per-user locks are dropped this often (seconds)
+LOCK_CLEANUP_INTERVAL = 3600
+
+
+def per_user_serialized(handler):
+    """Run a conversation step under the user's lock so one user's steps never interleave"""
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        async with self._lock_for(update.effective_user.id):
+            return await handler(self, update, context, *args, **kwargs)
+    return wrapper
+
+
+@functools.lru_cache(maxsize=512)
+def fmt_ts(dt: datetime) -> str:
+    """Format timestamp for display (memoized, values repeat between clicks)"""
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@functools.lru_cache(maxsize=2048)
+def md(value) -> str:
+    """Escape a dynamic value for MarkdownV2 (memoized, same names/phones repeat)"""
+    return escape_markdown(str(value), version=2)
+
+
 class ControlBot:
     """Main control bot class with full management features"""
 
+    __slots__ = (
+        'token', 'authorized_user_ids', 'application', 'temp_data',
+        '_dispatch', '_user_locks', '_lock_cleanup_task', '_bg_tasks', '_row_cache'
+    )
+
     def __init__(self, token: str, authorized_user_ids: list):
         """
         Initialize control bot.
@@ -81,6 +191,70 @@ class ControlBot:
         # Temporary storage for conversations
         self.temp_data = {}
 
+        # Per-user locks: same-user steps run in order, different users stay concurrent
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._lock_cleanup_task: Optional[asyncio.Task] = None
+
+        # Callback router: "op:arg" callback data -> handler
+        self._dispatch = self._build_dispatch()
+
+        # Callback handlers running in the background (see callback_handler)
+        self._bg_tasks: Set[asyncio.Task] = set()
+
+        # (kind, id) -> (expires_at, row) for session/bot lookups
+        self._row_cache: Dict[tuple, tuple] = {}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _back_markup(target: str, label: str = "« Назад") -> InlineKeyboardMarkup:
+        """
+        Single-button navigation markup, cached per (target, label).
+
+        PTB markups are slotted without __weakref__, so a WeakValueDictionary
+        pool is not possible; the LRU is sized to hold every session/bot target.
+        """
+        return InlineKeyboardMarkup([[InlineKeyboardButton(label, callback_data=target)]])
+
+    def _lock_for(self, user_id: int) -> asyncio.Lock:
+        """Get (or create) the conversation lock for a user"""
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def _lock_cleanup_loop(self):
+        """Periodically drop locks of users with no conversation in progress"""
+        while True:
+            await asyncio.sleep(LOCK_CLEANUP_INTERVAL)
+            for user_id, lock in list(self._user_locks.items()):
+                if not lock.locked() and user_id not in self.temp_data:
+                    del self._user_locks[user_id]
+
+    async def _get_cached_row(self, kind: str, row_id: int, loader):
+        """Load a DB row off the event loop, reusing it for ROW_CACHE_TTL seconds"""
+        key = (kind, row_id)
+        now = time.monotonic()
+        entry = self._row_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        row = await asyncio.to_thread(loader, row_id)
+        if row is not None:
+            self._row_cache[key] = (now + ROW_CACHE_TTL, row)
+        return row
+
+    async def _get_session(self, session_id: int):
+        """Get session by ID (cached)"""
+        return await self._get_cached_row('session', session_id, db.get_session_by_id)
+
+    async def _get_bot(self, bot_id: int):
+        """Get target bot by ID (cached)"""
+        return await self._get_cached_row('bot', bot_id, db.get_bot_by_id)
+
+    def _invalidate_row(self, kind: str, row_id: int):
+        """Drop a cached row after it was changed"""
+        self._row_cache.pop((kind, row_id), None)
+
     def is_authorized(self, user_id: int) -> bool:
         """Check if user is authorized"""
         return user_id in self.authorized_user_ids or db.is_user_authorized(user_id)
@@ -106,19 +280,11 @@ class ControlBot:
         if not await self.auth_required(update, context):
             return
 
-        keyboard = [
-            [InlineKeyboardButton("📊 Статус", callback_data="main_status")],
-            [InlineKeyboardButton("📱 Сессии", callback_data="main_sessions")],
-            [InlineKeyboardButton("🤖 Боты", callback_data="main_bots")],
-            [InlineKeyboardButton("💚 Проверка здоровья", callback_data="main_health")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await update.message.reply_text(
             "🎮 *Панель управления автоматизацией*\n\n"
-            "Добро пожаловать! Выберите опцию:",
-            parse_mode='Markdown',
-            reply_markup=reply_markup
+            "Добро пожаловать\\! Выберите опцию:",
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=MAIN_MENU_MARKUP
         )
 
     async def cmd_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -126,7 +292,7 @@ class ControlBot:
         if not await self.auth_required(update, context):
             return
 
-        status = session_manager.get_all_status()
+        status = await session_manager.get_all_status()
 
         text = "📊 *Общий статус*\n\n"
         text += f"Всего сессий: {status['total_sessions']}\n"
@@ -136,7 +302,7 @@ class ControlBot:
 
         for session_status in status['sessions']:
             text += f"━━━━━━━━━━━━━━━━\n"
-            text += f"📱 *Сессия:* {session_status['phone']}\n"
+            text += f"📱 *Сессия:* {md(session_status['phone'])}\n"
             text += f"Статус: {'🟢 Подключена' if session_status['is_connected'] else '🔴 Отключена'}\n"
 
             if session_status['bots']:
@@ -145,34 +311,33 @@ class ControlBot:
                     status_emoji = "🟢" if bot['running'] else "⚫"
                     mode_emoji = "🔄" if bot['mode'] == 'full_cycle' else "📋"
                     mode_text = "Полный цикл" if bot['mode'] == 'full_cycle' else "Только список"
-                    text += f"{status_emoji} {bot['username']} {mode_emoji}\n"
+                    success_rate = md(f"{bot['statistics']['success_rate']:.1f}")
+                    text += f"{status_emoji} {md(bot['username'])} {mode_emoji}\n"
                     text += f"   Режим: {mode_text}\n"
-                    text += f"   Успешность: {bot['statistics']['success_rate']:.1f}%\n"
+                    text += f"   Успешность: {success_rate}%\n"
                     text += f"   Всего запусков: {bot['statistics']['total_runs']}\n"
 
-        await update.message.reply_text(text, parse_mode='Markdown')
+        await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN_V2)
 
     # ==================== Main Menu Callbacks ====================
 
-    async def callback_main_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_main_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str = ''):
         """Show overall status"""
         query = update.callback_query
         await query.answer()
 
-        status = session_manager.get_all_status()
+        status = session_manager.get_summary()
 
-        text = "📊 *Общий статус*\n\n"
+        # Plain text: no markup needed, skips server-side Markdown parsing
+        text = "📊 Общий статус\n\n"
         text += f"Всего сессий: {status['total_sessions']}\n"
         text += f"Подключено сессий: {status['connected_sessions']}\n"
         text += f"Всего ботов: {status['total_automations']}\n"
         text += f"Активных ботов: {status['active_automations']}\n"
 
-        keyboard = [[InlineKeyboardButton("« Назад", callback_data="back_to_main")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, reply_markup=self._back_markup("back_to_main"))
 
-    async def callback_main_sessions(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_main_sessions(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str = ''):
         """Show sessions menu"""
         query = update.callback_query
         await query.answer()
@@ -187,7 +352,7 @@ class ControlBot:
             keyboard.append([
                 InlineKeyboardButton(
                     f"{status_emoji} {session.phone}",
-                    callback_data=f"session_{session.id}"
+                    callback_data=f"session:{session.id}"
                 )
             ])
 
@@ -197,11 +362,11 @@ class ControlBot:
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         if not sessions:
-            text += "Сессий пока нет.\n"
+            text += "Сессий пока нет\\.\n"
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_main_bots(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_main_bots(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str = ''):
         """Show bots menu"""
         query = update.callback_query
         await query.answer()
@@ -212,11 +377,11 @@ class ControlBot:
 
         keyboard = []
         for session in sessions:
-            bot_count = len(db.get_bots_by_session(session.id))
+            bot_count = len(session.target_bots)
             keyboard.append([
                 InlineKeyboardButton(
                     f"{session.phone} ({bot_count} ботов)",
-                    callback_data=f"session_bots_{session.id}"
+                    callback_data=f"session_bots:{session.id}"
                 )
             ])
 
@@ -224,173 +389,154 @@ class ControlBot:
 
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_main_health(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_main_health(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str = ''):
         """Show health check"""
         query = update.callback_query
         await query.answer()
 
-        status = session_manager.get_all_status()
-
-        text = "💚 *Проверка здоровья системы*\n\n"
+        # Plain text: bot usernames may contain '_' which breaks Markdown anyway
+        text = "💚 Проверка здоровья системы\n\n"
 
         all_healthy = True
 
-        for session_status in status['sessions']:
-            if not session_status['is_connected']:
+        for session in db.get_all_sessions():
+            if session.id not in session_manager.sessions:
                 all_healthy = False
-                text += f"🔴 Сессия {session_status['phone']} отключена\n"
+                text += f"🔴 Сессия {session.phone} отключена\n"
 
-            for bot in session_status['bots']:
-                if bot['enabled'] and not bot['running']:
-                    all_healthy = False
-                    text += f"⚠️ Бот {bot['username']} должен работать, но неактивен\n"
+        # Only candidate rows come back from the DB; low success rate is filtered in SQL
+        for bot, stats in db.get_unhealthy_bots():
+            if bot.automation_enabled and bot.id not in session_manager.automations:
+                all_healthy = False
+                text += f"⚠️ Бот {bot.bot_username} должен работать, но неактивен\n"
 
-                if bot['statistics']['success_rate'] < 50 and bot['statistics']['total_runs'] > 10:
-                    all_healthy = False
-                    text += f"⚠️ Бот {bot['username']} имеет низкую успешность ({bot['statistics']['success_rate']:.1f}%)\n"
+            if stats and stats.total_runs > 10 and stats.success_rate < 50:
+                all_healthy = False
+                text += f"⚠️ Бот {bot.bot_username} имеет низкую успешность ({stats.success_rate:.1f}%)\n"
 
         if all_healthy:
             text += "✅ Все системы работают нормально\n"
 
-        keyboard = [[InlineKeyboardButton("« Назад", callback_data="back_to_main")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, reply_markup=self._back_markup("back_to_main"))
 
-    async def callback_back_to_main(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_back_to_main(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str = ''):
         """Back to main menu"""
         query = update.callback_query
         await query.answer()
 
-        keyboard = [
-            [InlineKeyboardButton("📊 Статус", callback_data="main_status")],
-            [InlineKeyboardButton("📱 Сессии", callback_data="main_sessions")],
-            [InlineKeyboardButton("🤖 Боты", callback_data="main_bots")],
-            [InlineKeyboardButton("💚 Проверка здоровья", callback_data="main_health")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
             "🎮 *Панель управления*\n\nВыберите опцию:",
-            parse_mode='Markdown',
-            reply_markup=reply_markup
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=MAIN_MENU_MARKUP
         )
 
     # ==================== Session Management ====================
 
-    async def callback_session_detail(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_session_detail(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Show session detail"""
         query = update.callback_query
         await query.answer()
 
-        session_id = int(query.data.split('_')[1])
+        session_id = int(arg)
         session_status = session_manager.get_session_status(session_id)
 
-        text = f"📱 *Сессия: {session_status['phone']}*\n\n"
+        text = f"📱 *Сессия: {md(session_status['phone'])}*\n\n"
         text += f"Статус: {'🟢 Подключена' if session_status['is_connected'] else '🔴 Отключена'}\n"
 
         if session_status['last_connected']:
-            text += f"Последнее подключение: {session_status['last_connected']}\n"
+            text += f"Последнее подключение: {md(session_status['last_connected'])}\n"
 
-        text += f"\n*Боты ({len(session_status['bots'])}):*\n"
+        text += f"\n*Боты \\({len(session_status['bots'])}\\):*\n"
 
         for bot in session_status['bots']:
             status_emoji = "🟢" if bot['running'] else "⚫"
-            text += f"{status_emoji} {bot['username']}\n"
+            text += f"{status_emoji} {md(bot['username'])}\n"
 
         keyboard = []
 
         if session_status['is_connected']:
-            keyboard.append([InlineKeyboardButton("🔌 Отключить", callback_data=f"session_disconnect_{session_id}")])
+            keyboard.append([InlineKeyboardButton("🔌 Отключить", callback_data=f"session_disconnect:{session_id}")])
         else:
-            keyboard.append([InlineKeyboardButton("🔌 Подключить", callback_data=f"session_connect_{session_id}")])
-            keyboard.append([InlineKeyboardButton("🔐 Переавторизация", callback_data=f"session_reauth_{session_id}")])
+            keyboard.append([InlineKeyboardButton("🔌 Подключить", callback_data=f"session_connect:{session_id}")])
+            keyboard.append([InlineKeyboardButton("🔐 Переавторизация", callback_data=f"session_reauth:{session_id}")])
 
-        keyboard.append([InlineKeyboardButton("🤖 Управление ботами", callback_data=f"session_bots_{session_id}")])
-        keyboard.append([InlineKeyboardButton("🗑️ Удалить сессию", callback_data=f"session_delete_confirm_{session_id}")])
+        keyboard.append([InlineKeyboardButton("🤖 Управление ботами", callback_data=f"session_bots:{session_id}")])
+        keyboard.append([InlineKeyboardButton("🗑️ Удалить сессию", callback_data=f"session_delete_confirm:{session_id}")])
         keyboard.append([InlineKeyboardButton("« Назад", callback_data="main_sessions")])
 
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_session_connect(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_session_connect(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Connect a session"""
         query = update.callback_query
         await query.answer("Подключаем сессию...")
 
-        session_id = int(query.data.split('_')[2])
+        session_id = int(arg)
 
         try:
             success = await session_manager.connect_session(session_id)
             if success:
                 await query.edit_message_text(
                     "✅ Сессия успешно подключена",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}")
                 )
             else:
                 await query.edit_message_text(
                     "⚠️ Сессия требует авторизации. Используйте кнопку 'Переавторизация'.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}")
                 )
         except Exception as e:
             await query.edit_message_text(
                 f"❌ Ошибка: {str(e)}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}")
             )
 
-    async def callback_session_disconnect(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_session_disconnect(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Disconnect a session"""
         query = update.callback_query
         await query.answer("Отключаем сессию...")
 
-        session_id = int(query.data.split('_')[2])
+        session_id = int(arg)
 
         try:
             await session_manager.disconnect_session(session_id)
             await query.edit_message_text(
                 "✅ Сессия отключена",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}")
             )
         except Exception as e:
             await query.edit_message_text(f"❌ Ошибка: {str(e)}")
 
-    async def callback_session_delete_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_session_delete_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Confirm session deletion"""
         query = update.callback_query
         await query.answer()
 
-        session_id = int(query.data.split('_')[3])
-        session = db.get_session_by_id(session_id)
+        session_id = int(arg)
+        session = await self._get_session(session_id)
 
         text = f"⚠️ *Подтверждение удаления*\n\n"
-        text += f"Вы уверены, что хотите удалить сессию *{session.phone}*?\n\n"
-        text += "Все боты этой сессии также будут удалены!"
+        text += f"Вы уверены, что хотите удалить сессию *{md(session.phone)}*?\n\n"
+        text += "Все боты этой сессии также будут удалены\\!"
 
         keyboard = [
-            [InlineKeyboardButton("❌ Да, удалить", callback_data=f"session_delete_{session_id}")],
-            [InlineKeyboardButton("« Отмена", callback_data=f"session_{session_id}")]
+            [InlineKeyboardButton("❌ Да, удалить", callback_data=f"session_delete:{session_id}")],
+            [InlineKeyboardButton("« Отмена", callback_data=f"session:{session_id}")]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_session_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_session_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Delete a session"""
         query = update.callback_query
         await query.answer("Удаляем сессию...")
 
-        session_id = int(query.data.split('_')[2])
+        session_id = int(arg)
 
         try:
             # First disconnect
@@ -398,29 +544,28 @@ class ControlBot:
                 await session_manager.disconnect_session(session_id)
 
             # Then delete
-            db.delete_session(session_id)
+            session_manager.remove_session(session_id)
+            self._invalidate_row('session', session_id)
 
             await query.edit_message_text(
                 "✅ Сессия удалена",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data="main_sessions")
-                ]])
+                reply_markup=self._back_markup("main_sessions")
             )
         except Exception as e:
             await query.edit_message_text(f"❌ Ошибка: {str(e)}")
 
     # ==================== Bot Management ====================
 
-    async def callback_session_bots(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_session_bots(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Show bots for a session"""
         query = update.callback_query
         await query.answer()
 
-        session_id = int(query.data.split('_')[2])
-        session = db.get_session_by_id(session_id)
+        session_id = int(arg)
+        session = await self._get_session(session_id)
         bots = db.get_bots_by_session(session_id)
 
-        text = f"🤖 *Боты для {session.phone}*\n\n"
+        text = f"🤖 *Боты для {md(session.phone)}*\n\n"
 
         keyboard = []
         for bot in bots:
@@ -429,169 +574,158 @@ class ControlBot:
             keyboard.append([
                 InlineKeyboardButton(
                     f"{status_emoji} {bot.bot_username} {mode_emoji}",
-                    callback_data=f"bot_{bot.id}"
+                    callback_data=f"bot:{bot.id}"
                 )
             ])
 
-        keyboard.append([InlineKeyboardButton("➕ Добавить бота", callback_data=f"add_bot_start_{session_id}")])
-        keyboard.append([InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")])
+        keyboard.append([InlineKeyboardButton("➕ Добавить бота", callback_data=f"add_bot_start:{session_id}")])
+        keyboard.append([InlineKeyboardButton("« Назад", callback_data=f"session:{session_id}")])
 
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         if not bots:
-            text += "Ботов пока нет.\n"
+            text += "Ботов пока нет\\.\n"
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_bot_detail(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_bot_detail(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Show bot detail and controls"""
         query = update.callback_query
         await query.answer()
 
-        bot_id = int(query.data.split('_')[1])
-        bot = db.get_bot_by_id(bot_id)
+        bot_id = int(arg)
+        bot = await self._get_bot(bot_id)
         stats = db.get_statistics(bot_id)
 
         is_running = bot_id in session_manager.automations
 
         mode_text = "Полный цикл" if bot.automation_mode == 'full_cycle' else "Только список"
 
-        text = f"🤖 *{bot.bot_username}*\n\n"
+        text = f"🤖 *{md(bot.bot_username)}*\n\n"
         text += f"Статус: {'🟢 Работает' if is_running else '⚫ Остановлен'}\n"
         text += f"Режим: {mode_text}\n"
 
         # Step 2 configuration
         if bot.step2_button_keywords:
-            text += f"Шаг 2: по ключевым словам ({bot.step2_button_keywords})\n"
+            text += f"Шаг 2: по ключевым словам \\({md(bot.step2_button_keywords)}\\)\n"
         else:
-            text += f"Шаг 2: кнопка #{bot.step2_button_index + 1}\n"
+            text += f"Шаг 2: кнопка \\#{bot.step2_button_index + 1}\n"
 
         if stats:
             text += f"\n*Статистика:*\n"
             text += f"Всего запусков: {stats.total_runs}\n"
-            text += f"Успешность: {stats.success_rate:.1f}%\n"
+            text += f"Успешность: {md(f'{stats.success_rate:.1f}')}%\n"
             text += f"Всего кликов: {stats.total_clicks}\n"
-            text += f"Успешность кликов: {stats.click_success_rate:.1f}%\n"
+            text += f"Успешность кликов: {md(f'{stats.click_success_rate:.1f}')}%\n"
 
             if stats.last_activity_at:
-                text += f"Последняя активность: {stats.last_activity_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                text += f"Последняя активность: {md(fmt_ts(stats.last_activity_at))}\n"
 
             if stats.last_error:
-                text += f"\n⚠️ Последняя ошибка: {stats.last_error}\n"
+                text += f"\n⚠️ Последняя ошибка: {md(stats.last_error)}\n"
 
         keyboard = []
 
         # Start/Stop button
         if is_running:
-            keyboard.append([InlineKeyboardButton("⏹️ Остановить", callback_data=f"bot_stop_{bot_id}")])
+            keyboard.append([InlineKeyboardButton("⏹️ Остановить", callback_data=f"bot_stop:{bot_id}")])
         else:
-            keyboard.append([InlineKeyboardButton("▶️ Запустить", callback_data=f"bot_start_{bot_id}")])
+            keyboard.append([InlineKeyboardButton("▶️ Запустить", callback_data=f"bot_start:{bot_id}")])
 
         # Mode selection
         if bot.automation_mode == 'full_cycle':
-            keyboard.append([InlineKeyboardButton("📋 Переключить на режим 'Только список'", callback_data=f"bot_mode_list_{bot_id}")])
+            keyboard.append([InlineKeyboardButton("📋 Переключить на режим 'Только список'", callback_data=f"bot_mode_list:{bot_id}")])
         else:
-            keyboard.append([InlineKeyboardButton("🔄 Переключить на режим 'Полный цикл'", callback_data=f"bot_mode_full_{bot_id}")])
+            keyboard.append([InlineKeyboardButton("🔄 Переключить на режим 'Полный цикл'", callback_data=f"bot_mode_full:{bot_id}")])
 
         # Step 2 configuration
-        keyboard.append([InlineKeyboardButton("⚙️ Настроить Шаг 2", callback_data=f"config_step2_start_{bot_id}")])
+        keyboard.append([InlineKeyboardButton("⚙️ Настроить Шаг 2", callback_data=f"config_step2_start:{bot_id}")])
 
-        keyboard.append([InlineKeyboardButton("🗑️ Удалить бота", callback_data=f"bot_delete_confirm_{bot_id}")])
-        keyboard.append([InlineKeyboardButton("« Назад", callback_data=f"session_bots_{bot.session_id}")])
+        keyboard.append([InlineKeyboardButton("🗑️ Удалить бота", callback_data=f"bot_delete_confirm:{bot_id}")])
+        keyboard.append([InlineKeyboardButton("« Назад", callback_data=f"session_bots:{bot.session_id}")])
 
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_bot_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_bot_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Start bot automation"""
         query = update.callback_query
         await query.answer("Запускаем автоматизацию...")
 
-        bot_id = int(query.data.split('_')[2])
+        bot_id = int(arg)
 
         try:
             await session_manager.start_automation(bot_id)
             await query.edit_message_text(
                 "✅ Автоматизация запущена",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"bot_{bot_id}")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}")
             )
         except Exception as e:
             await query.edit_message_text(
                 f"❌ Ошибка: {str(e)}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"bot_{bot_id}")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}")
             )
 
-    async def callback_bot_stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_bot_stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Stop bot automation"""
         query = update.callback_query
         await query.answer("Останавливаем автоматизацию...")
 
-        bot_id = int(query.data.split('_')[2])
+        bot_id = int(arg)
 
         try:
             await session_manager.stop_automation(bot_id)
             await query.edit_message_text(
                 "✅ Автоматизация остановлена",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"bot_{bot_id}")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}")
             )
         except Exception as e:
             await query.edit_message_text(f"❌ Ошибка: {str(e)}")
 
-    async def callback_bot_mode_change(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_bot_mode_change(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str, mode: str):
         """Change bot mode"""
         query = update.callback_query
         await query.answer("Меняем режим...")
 
-        parts = query.data.split('_')
-        mode_type = parts[2]  # 'list' or 'full'
-        bot_id = int(parts[3])
-
-        mode = 'list_only' if mode_type == 'list' else 'full_cycle'
+        bot_id = int(arg)
 
         try:
             await session_manager.set_automation_mode(bot_id, mode)
+            self._invalidate_row('bot', bot_id)
             await query.edit_message_text(
                 f"✅ Режим изменен на {mode}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"bot_{bot_id}")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}")
             )
         except Exception as e:
             await query.edit_message_text(f"❌ Ошибка: {str(e)}")
 
-    async def callback_bot_delete_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_bot_delete_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Confirm bot deletion"""
         query = update.callback_query
         await query.answer()
 
-        bot_id = int(query.data.split('_')[3])
-        bot = db.get_bot_by_id(bot_id)
+        bot_id = int(arg)
+        bot = await self._get_bot(bot_id)
 
         text = f"⚠️ *Подтверждение удаления*\n\n"
-        text += f"Вы уверены, что хотите удалить бота *{bot.bot_username}*?"
+        text += f"Вы уверены, что хотите удалить бота *{md(bot.bot_username)}*?"
 
         keyboard = [
-            [InlineKeyboardButton("❌ Да, удалить", callback_data=f"bot_delete_{bot_id}")],
-            [InlineKeyboardButton("« Отмена", callback_data=f"bot_{bot_id}")]
+            [InlineKeyboardButton("❌ Да, удалить", callback_data=f"bot_delete:{bot_id}")],
+            [InlineKeyboardButton("« Отмена", callback_data=f"bot:{bot_id}")]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=reply_markup)
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
 
-    async def callback_bot_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def callback_bot_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
         """Delete a bot"""
         query = update.callback_query
         await query.answer("Удаляем бота...")
 
-        bot_id = int(query.data.split('_')[2])
-        bot = db.get_bot_by_id(bot_id)
+        bot_id = int(arg)
+        bot = await self._get_bot(bot_id)
         session_id = bot.session_id
 
         try:
@@ -601,34 +735,35 @@ class ControlBot:
 
             # Then delete
             db.delete_bot(bot_id)
+            self._invalidate_row('bot', bot_id)
 
             await query.edit_message_text(
                 "✅ Бот удален",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_bots_{session_id}")
-                ]])
+                reply_markup=self._back_markup(f"session_bots:{session_id}")
             )
         except Exception as e:
             await query.edit_message_text(f"❌ Ошибка: {str(e)}")
 
     # ==================== Add Session Conversation ====================
 
+    @per_user_serialized
     async def add_session_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start add session conversation"""
         query = update.callback_query
         await query.answer()
 
         user_id = update.effective_user.id
-        self.temp_data[user_id] = {}
+        self.temp_data[user_id] = AddSessionState()
 
         await query.edit_message_text(
             "📱 *Добавление новой сессии*\n\n"
-            "Введите номер телефона в международном формате (например, +79991234567):",
-            parse_mode='Markdown'
+            "Введите номер телефона в международном формате \\(например, \\+79991234567\\):",
+            parse_mode=ParseMode.MARKDOWN_V2
         )
 
         return ADD_SESSION_PHONE
 
+    @per_user_serialized
     async def add_session_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive phone number"""
         user_id = update.effective_user.id
@@ -642,16 +777,17 @@ class ControlBot:
             )
             return ADD_SESSION_PHONE
 
-        self.temp_data[user_id]['phone'] = phone
+        self.temp_data[user_id].phone = phone
 
         await update.message.reply_text(
-            "Отлично! Теперь введите ваш *API ID* от Telegram:\n"
-            "(Получить можно на https://my.telegram.org/apps)",
-            parse_mode='Markdown'
+            "Отлично\\! Теперь введите ваш *API ID* от Telegram:\n"
+            "\\(Получить можно на https://my\\.telegram\\.org/apps\\)",
+            parse_mode=ParseMode.MARKDOWN_V2
         )
 
         return ADD_SESSION_API_ID
 
+    @per_user_serialized
     async def add_session_api_id(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive API ID"""
         user_id = update.effective_user.id
@@ -659,11 +795,11 @@ class ControlBot:
 
         try:
             api_id = int(api_id_text)
-            self.temp_data[user_id]['api_id'] = api_id
+            self.temp_data[user_id].api_id = api_id
 
             await update.message.reply_text(
-                "Отлично! Теперь введите ваш *API Hash* от Telegram:",
-                parse_mode='Markdown'
+                "Отлично\\! Теперь введите ваш *API Hash* от Telegram:",
+                parse_mode=ParseMode.MARKDOWN_V2
             )
 
             return ADD_SESSION_API_HASH
@@ -673,20 +809,22 @@ class ControlBot:
             )
             return ADD_SESSION_API_ID
 
+    @per_user_serialized
     async def add_session_api_hash(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive API Hash and create session"""
         user_id = update.effective_user.id
         api_hash = update.message.text.strip()
 
-        self.temp_data[user_id]['api_hash'] = api_hash
+        data = self.temp_data[user_id]
+        data.api_hash = api_hash
 
-        phone = self.temp_data[user_id]['phone']
-        api_id = self.temp_data[user_id]['api_id']
+        phone = data.phone
+        api_id = data.api_id
 
         try:
             # Create session
             session = await session_manager.add_session(phone, api_id, api_hash)
-            self.temp_data[user_id]['session_id'] = session.id
+            data.session_id = session.id
 
             # Request authorization code
             result = await session_manager.authorize_session(session.id, phone)
@@ -706,13 +844,15 @@ class ControlBot:
             await update.message.reply_text(f"❌ Ошибка при создании сессии: {str(e)}")
             return ConversationHandler.END
 
+    @per_user_serialized
     async def add_session_code(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive verification code"""
         user_id = update.effective_user.id
         code = update.message.text.strip()
 
-        session_id = self.temp_data[user_id]['session_id']
-        phone = self.temp_data[user_id]['phone']
+        data = self.temp_data[user_id]
+        session_id = data.session_id
+        phone = data.phone
 
         try:
             result = await session_manager.authorize_session(session_id, phone, code=code)
@@ -721,9 +861,7 @@ class ControlBot:
                 await update.message.reply_text(
                     "✅ Сессия успешно авторизована!\n\n"
                     "Теперь можете добавить ботов для этой сессии.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« Вернуться к сессиям", callback_data="main_sessions")
-                    ]])
+                    reply_markup=self._back_markup("main_sessions", "« Вернуться к сессиям")
                 )
                 return ConversationHandler.END
 
@@ -742,12 +880,13 @@ class ControlBot:
             await update.message.reply_text(f"❌ Ошибка при авторизации: {str(e)}")
             return ConversationHandler.END
 
+    @per_user_serialized
     async def add_session_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive 2FA password"""
         user_id = update.effective_user.id
         password = update.message.text.strip()
 
-        session_id = self.temp_data[user_id]['session_id']
+        session_id = self.temp_data[user_id].session_id
 
         try:
             result = await session_manager.authorize_session(session_id, None, password=password)
@@ -756,9 +895,7 @@ class ControlBot:
                 await update.message.reply_text(
                     "✅ Сессия успешно авторизована с 2FA!\n\n"
                     "Теперь можете добавить ботов для этой сессии.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« Вернуться к сессиям", callback_data="main_sessions")
-                    ]])
+                    reply_markup=self._back_markup("main_sessions", "« Вернуться к сессиям")
                 )
                 return ConversationHandler.END
             else:
@@ -769,50 +906,48 @@ class ControlBot:
             await update.message.reply_text(f"❌ Ошибка при авторизации: {str(e)}")
             return ConversationHandler.END
 
+    @per_user_serialized
     async def add_session_cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel add session conversation"""
         user_id = update.effective_user.id
-        if user_id in self.temp_data:
-            del self.temp_data[user_id]
+        self.temp_data.pop(user_id, None)
 
         if update.message:
             await update.message.reply_text(
                 "❌ Добавление сессии отменено.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data="main_sessions")
-                ]])
+                reply_markup=self._back_markup("main_sessions")
             )
         elif update.callback_query:
             await update.callback_query.edit_message_text(
                 "❌ Добавление сессии отменено.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data="main_sessions")
-                ]])
+                reply_markup=self._back_markup("main_sessions")
             )
 
         return ConversationHandler.END
 
     # ==================== Add Bot Conversation ====================
 
+    @per_user_serialized
     async def add_bot_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start add bot conversation"""
         query = update.callback_query
         await query.answer()
 
-        session_id = int(query.data.split('_')[3])
-        session = db.get_session_by_id(session_id)
+        session_id = int(query.data.partition(':')[2])
+        session = await self._get_session(session_id)
 
         user_id = update.effective_user.id
-        self.temp_data[user_id] = {'session_id': session_id}
+        self.temp_data[user_id] = AddBotState(session_id=session_id)
 
         await query.edit_message_text(
-            f"🤖 *Добавление бота для {session.phone}*\n\n"
-            f"Введите username бота (например: @apri1l_test_bot):",
-            parse_mode='Markdown'
+            f"🤖 *Добавление бота для {md(session.phone)}*\n\n"
+            "Введите username бота \\(например: @apri1l\\_test\\_bot\\):",
+            parse_mode=ParseMode.MARKDOWN_V2
         )
 
         return ADD_BOT_USERNAME
 
+    @per_user_serialized
     async def add_bot_username(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive bot username"""
         user_id = update.effective_user.id
@@ -822,87 +957,78 @@ class ControlBot:
         if not username.startswith('@'):
             username = '@' + username
 
-        self.temp_data[user_id]['bot_username'] = username
-
-        keyboard = [
-            [InlineKeyboardButton("🔄 Полный цикл (3 кнопки)", callback_data="addbot_mode_full")],
-            [InlineKeyboardButton("📋 Только список (1 кнопка)", callback_data="addbot_mode_list")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        self.temp_data[user_id].bot_username = username
 
         await update.message.reply_text(
             f"Отлично! Бот: {username}\n\n"
             "Теперь выберите режим работы:",
-            reply_markup=reply_markup
+            reply_markup=ADD_BOT_MODE_MARKUP
         )
 
         return ADD_BOT_MODE
 
+    @per_user_serialized
     async def add_bot_mode(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive automation mode"""
         query = update.callback_query
         await query.answer()
 
         user_id = update.effective_user.id
-        mode_type = query.data.split('_')[2]  # 'full' or 'list'
+        mode_type = query.data[len(_PREFIX_ADDBOT_MODE):]  # 'full' or 'list'
 
         mode = 'full_cycle' if mode_type == 'full' else 'list_only'
-        self.temp_data[user_id]['mode'] = mode
+        self.temp_data[user_id].mode = mode
 
         # If list_only, skip Step 2 config
         if mode == 'list_only':
             # Create bot immediately
-            await self._create_bot(user_id, query)
+            await self._finish_add_bot(user_id, query.edit_message_text)
             return ConversationHandler.END
 
         # Otherwise ask about Step 2 configuration
-        keyboard = [
-            [InlineKeyboardButton("🔢 По номеру кнопки (1-я, 2-я, ...)", callback_data="addbot_step2_index")],
-            [InlineKeyboardButton("🔤 По ключевым словам", callback_data="addbot_step2_keywords")],
-            [InlineKeyboardButton("⏩ Пропустить (1-я кнопка)", callback_data="addbot_step2_skip")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
             "⚙️ *Настройка Шага 2*\n\n"
             "Как выбирать кнопку на втором шаге?",
-            parse_mode='Markdown',
-            reply_markup=reply_markup
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=ADD_BOT_STEP2_MARKUP
         )
 
         return ADD_BOT_STEP2_METHOD
 
+    @per_user_serialized
     async def add_bot_step2_method(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Choose Step 2 method"""
         query = update.callback_query
         await query.answer()
 
         user_id = update.effective_user.id
-        method = query.data.split('_')[2]  # 'index', 'keywords', or 'skip'
+        method = query.data[len(_PREFIX_ADDBOT_STEP2):]  # 'index', 'keywords', or 'skip'
 
         if method == 'skip':
             # Use default (first button)
-            self.temp_data[user_id]['step2_keywords'] = None
-            self.temp_data[user_id]['step2_index'] = 0
-            await self._create_bot(user_id, query)
+            data = self.temp_data[user_id]
+            data.step2_keywords = None
+            data.step2_index = 0
+            await self._finish_add_bot(user_id, query.edit_message_text)
             return ConversationHandler.END
 
         elif method == 'index':
             await query.edit_message_text(
                 "🔢 *Выбор по номеру кнопки*\n\n"
-                "Введите номер кнопки (1 = первая, 2 = вторая, и т.д.):",
-                parse_mode='Markdown'
+                "Введите номер кнопки \\(1 \\= первая, 2 \\= вторая, и т\\.д\\.\\):",
+                parse_mode=ParseMode.MARKDOWN_V2
             )
             return ADD_BOT_STEP2_INDEX
 
         elif method == 'keywords':
             await query.edit_message_text(
                 "🔤 *Выбор по ключевым словам*\n\n"
-                "Введите ключевые слова через запятую (например: Москва,доставка):",
-                parse_mode='Markdown'
+                "Введите ключевые слова через запятую \\(например: Москва,доставка\\):",
+                parse_mode=ParseMode.MARKDOWN_V2
             )
             return ADD_BOT_STEP2_KEYWORDS
 
+    @per_user_serialized
     async def add_bot_step2_index(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive button index"""
         user_id = update.effective_user.id
@@ -913,10 +1039,11 @@ class ControlBot:
             if index < 0:
                 raise ValueError("Index must be >= 1")
 
-            self.temp_data[user_id]['step2_keywords'] = None
-            self.temp_data[user_id]['step2_index'] = index
+            data = self.temp_data[user_id]
+            data.step2_keywords = None
+            data.step2_index = index
 
-            await self._create_bot_from_message(user_id, update.message)
+            await self._finish_add_bot(user_id, update.message.reply_text)
             return ConversationHandler.END
 
         except ValueError:
@@ -925,166 +1052,144 @@ class ControlBot:
             )
             return ADD_BOT_STEP2_INDEX
 
+    @per_user_serialized
     async def add_bot_step2_keywords(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive keywords"""
         user_id = update.effective_user.id
         keywords = update.message.text.strip()
 
-        self.temp_data[user_id]['step2_keywords'] = keywords
-        self.temp_data[user_id]['step2_index'] = 0
+        data = self.temp_data[user_id]
+        data.step2_keywords = keywords
+        data.step2_index = 0
 
-        await self._create_bot_from_message(user_id, update.message)
+        await self._finish_add_bot(user_id, update.message.reply_text)
         return ConversationHandler.END
 
-    async def _create_bot(self, user_id: int, query):
-        """Helper to create bot"""
+    async def _finish_add_bot(self, user_id: int, send):
+        """
+        Create the bot collected in temp_data and report the result.
+
+        Runs under the caller's user lock.
+
+        Args:
+            user_id: Telegram user ID owning the conversation
+            send: query.edit_message_text or message.reply_text
+        """
         data = self.temp_data[user_id]
 
         try:
-            bot = await session_manager.add_bot(
-                data['session_id'],
-                data['bot_username'],
-                data['mode']
+            bot = await asyncio.wait_for(
+                session_manager.add_bot(data.session_id, data.bot_username, data.mode),
+                timeout=TELETHON_TIMEOUT
             )
 
-            # Update Step 2 config if present
-            if 'step2_keywords' in data or 'step2_index' in data:
-                db.update_bot_step2_config(
+            # Update Step 2 config if it differs from the defaults set by add_bot
+            if data.step2_keywords is not None or data.step2_index != 0:
+                await asyncio.to_thread(
+                    db.update_bot_step2_config,
                     bot.id,
-                    data.get('step2_keywords'),
-                    data.get('step2_index', 0)
+                    data.step2_keywords,
+                    data.step2_index
                 )
 
-            mode_text = "Полный цикл" if data['mode'] == 'full_cycle' else "Только список"
+            mode_text = "Полный цикл" if data.mode == 'full_cycle' else "Только список"
 
-            await query.edit_message_text(
-                f"✅ Бот {data['bot_username']} успешно добавлен!\n\n"
+            await send(
+                f"✅ Бот {data.bot_username} успешно добавлен!\n\n"
                 f"Режим: {mode_text}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« К ботам", callback_data=f"session_bots_{data['session_id']}")
-                ]])
-            )
-
-        except Exception as e:
-            await query.edit_message_text(f"❌ Ошибка при создании бота: {str(e)}")
-
-    async def _create_bot_from_message(self, user_id: int, message):
-        """Helper to create bot from message context"""
-        data = self.temp_data[user_id]
-
-        try:
-            bot = await session_manager.add_bot(
-                data['session_id'],
-                data['bot_username'],
-                data['mode']
+                reply_markup=self._back_markup(f"session_bots:{data.session_id}", "« К ботам")
             )
 
-            # Update Step 2 config
-            db.update_bot_step2_config(
-                bot.id,
-                data.get('step2_keywords'),
-                data.get('step2_index', 0)
-            )
-
-            mode_text = "Полный цикл" if data['mode'] == 'full_cycle' else "Только список"
-
-            await message.reply_text(
-                f"✅ Бот {data['bot_username']} успешно добавлен!\n\n"
-                f"Режим: {mode_text}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« К ботам", callback_data=f"session_bots_{data['session_id']}")
-                ]])
-            )
+        except asyncio.TimeoutError:
+            await send(TIMEOUT_TEXT)
 
         except Exception as e:
-            await message.reply_text(f"❌ Ошибка при создании бота: {str(e)}")
+            await send(f"❌ Ошибка при создании бота: {str(e)}")
 
+    @per_user_serialized
     async def add_bot_cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel add bot conversation"""
         user_id = update.effective_user.id
 
-        session_id = None
-        if user_id in self.temp_data:
-            session_id = self.temp_data[user_id].get('session_id')
-            del self.temp_data[user_id]
+        data = self.temp_data.pop(user_id, None)
+        session_id = getattr(data, 'session_id', None)
 
         if update.message:
             await update.message.reply_text(
                 "❌ Добавление бота отменено.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_bots_{session_id}" if session_id else "main_bots")
-                ]])
+                reply_markup=self._back_markup(f"session_bots:{session_id}" if session_id else "main_bots")
             )
         elif update.callback_query:
             await update.callback_query.edit_message_text(
                 "❌ Добавление бота отменено.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_bots_{session_id}" if session_id else "main_bots")
-                ]])
+                reply_markup=self._back_markup(f"session_bots:{session_id}" if session_id else "main_bots")
             )
 
         return ConversationHandler.END
 
     # ==================== Step 2 Configuration ====================
 
+    @per_user_serialized
     async def config_step2_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start Step 2 configuration"""
         query = update.callback_query
         await query.answer()
 
-        bot_id = int(query.data.split('_')[3])
-        bot = db.get_bot_by_id(bot_id)
+        bot_id = int(query.data.partition(':')[2])
+        bot = await self._get_bot(bot_id)
 
         user_id = update.effective_user.id
-        self.temp_data[user_id] = {'bot_id': bot_id}
+        self.temp_data[user_id] = ConfigStep2State(bot_id=bot_id)
 
         current_config = ""
         if bot.step2_button_keywords:
-            current_config = f"Текущая настройка: по ключевым словам ({bot.step2_button_keywords})"
+            current_config = f"Текущая настройка: по ключевым словам \\({md(bot.step2_button_keywords)}\\)"
         else:
-            current_config = f"Текущая настройка: кнопка #{bot.step2_button_index + 1}"
+            current_config = f"Текущая настройка: кнопка \\#{bot.step2_button_index + 1}"
 
         keyboard = [
             [InlineKeyboardButton("🔢 По номеру кнопки", callback_data="config_step2_index")],
             [InlineKeyboardButton("🔤 По ключевым словам", callback_data="config_step2_keywords")],
-            [InlineKeyboardButton("« Отмена", callback_data=f"bot_{bot_id}")]
+            [InlineKeyboardButton("« Отмена", callback_data=f"bot:{bot_id}")]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         await query.edit_message_text(
-            f"⚙️ *Настройка Шага 2 для {bot.bot_username}*\n\n"
+            f"⚙️ *Настройка Шага 2 для {md(bot.bot_username)}*\n\n"
             f"{current_config}\n\n"
             "Как выбирать кнопку на втором шаге?",
-            parse_mode='Markdown',
+            parse_mode=ParseMode.MARKDOWN_V2,
             reply_markup=reply_markup
         )
 
         return CONFIG_STEP2_METHOD
 
+    @per_user_serialized
     async def config_step2_method(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Choose Step 2 configuration method"""
         query = update.callback_query
         await query.answer()
 
         user_id = update.effective_user.id
-        method = query.data.split('_')[2]  # 'index' or 'keywords'
+        method = query.data[len(_PREFIX_CONFIG_STEP2):]  # 'index' or 'keywords'
 
         if method == 'index':
             await query.edit_message_text(
                 "🔢 *Выбор по номеру кнопки*\n\n"
-                "Введите номер кнопки (1 = первая, 2 = вторая, и т.д.):",
-                parse_mode='Markdown'
+                "Введите номер кнопки \\(1 \\= первая, 2 \\= вторая, и т\\.д\\.\\):",
+                parse_mode=ParseMode.MARKDOWN_V2
             )
             return CONFIG_STEP2_INDEX
 
         elif method == 'keywords':
             await query.edit_message_text(
                 "🔤 *Выбор по ключевым словам*\n\n"
-                "Введите ключевые слова через запятую (например: Москва,доставка):",
-                parse_mode='Markdown'
+                "Введите ключевые слова через запятую \\(например: Москва,доставка\\):",
+                parse_mode=ParseMode.MARKDOWN_V2
             )
             return CONFIG_STEP2_KEYWORDS
 
+    @per_user_serialized
     async def config_step2_index(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive button index"""
         user_id = update.effective_user.id
@@ -1095,9 +1200,10 @@ class ControlBot:
             if index < 0:
                 raise ValueError("Index must be >= 1")
 
-            bot_id = self.temp_data[user_id]['bot_id']
+            bot_id = self.temp_data[user_id].bot_id
 
-            db.update_bot_step2_config(bot_id, keywords=None, button_index=index)
+            await asyncio.to_thread(db.update_bot_step2_config, bot_id, keywords=None, button_index=index)
+            self._invalidate_row('bot', bot_id)
 
             # If bot is running, restart it
             if bot_id in session_manager.automations:
@@ -1106,9 +1212,7 @@ class ControlBot:
 
             await update.message.reply_text(
                 f"✅ Шаг 2 настроен: кнопка #{index + 1}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад к боту", callback_data=f"bot_{bot_id}")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}", "« Назад к боту")
             )
 
             return ConversationHandler.END
@@ -1119,14 +1223,16 @@ class ControlBot:
             )
             return CONFIG_STEP2_INDEX
 
+    @per_user_serialized
     async def config_step2_keywords(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive keywords"""
         user_id = update.effective_user.id
         keywords = update.message.text.strip()
 
-        bot_id = self.temp_data[user_id]['bot_id']
+        bot_id = self.temp_data[user_id].bot_id
 
-        db.update_bot_step2_config(bot_id, keywords=keywords, button_index=0)
+        await asyncio.to_thread(db.update_bot_step2_config, bot_id, keywords=keywords, button_index=0)
+        self._invalidate_row('bot', bot_id)
 
         # If bot is running, restart it
         if bot_id in session_manager.automations:
@@ -1135,99 +1241,102 @@ class ControlBot:
 
         await update.message.reply_text(
             f"✅ Шаг 2 настроен: по ключевым словам ({keywords})",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("« Назад к боту", callback_data=f"bot_{bot_id}")
-            ]])
+            reply_markup=self._back_markup(f"bot:{bot_id}", "« Назад к боту")
         )
 
         return ConversationHandler.END
 
+    @per_user_serialized
     async def config_step2_cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel Step 2 configuration"""
         user_id = update.effective_user.id
 
-        bot_id = None
-        if user_id in self.temp_data:
-            bot_id = self.temp_data[user_id].get('bot_id')
-            del self.temp_data[user_id]
+        data = self.temp_data.pop(user_id, None)
+        bot_id = getattr(data, 'bot_id', None)
 
         if update.message:
             await update.message.reply_text(
                 "❌ Настройка отменена.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"bot_{bot_id}" if bot_id else "main_bots")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}" if bot_id else "main_bots")
             )
         elif update.callback_query:
             await update.callback_query.edit_message_text(
                 "❌ Настройка отменена.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"bot_{bot_id}" if bot_id else "main_bots")
-                ]])
+                reply_markup=self._back_markup(f"bot:{bot_id}" if bot_id else "main_bots")
             )
 
         return ConversationHandler.END
 
     # ==================== Reauthorization ====================
 
+    @per_user_serialized
     async def reauth_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start reauthorization"""
         query = update.callback_query
         await query.answer()
 
-        session_id = int(query.data.split('_')[2])
-        session = db.get_session_by_id(session_id)
+        session_id = int(query.data.partition(':')[2])
+        session = await self._get_session(session_id)
 
         user_id = update.effective_user.id
-        self.temp_data[user_id] = {'session_id': session_id}
+        self.temp_data[user_id] = ReauthState(session_id=session_id)
 
         try:
             # Request new code
-            result = await session_manager.authorize_session(session_id, session.phone)
+            result = await asyncio.wait_for(
+                session_manager.authorize_session(session_id, session.phone),
+                timeout=TELETHON_TIMEOUT
+            )
 
             if result['status'] == 'code_sent':
                 await query.edit_message_text(
-                    f"🔐 *Переавторизация {session.phone}*\n\n"
-                    f"Код подтверждения отправлен в Telegram.\n\n"
+                    f"🔐 *Переавторизация {md(session.phone)}*\n\n"
+                    "Код подтверждения отправлен в Telegram\\.\n\n"
                     f"Введите код:",
-                    parse_mode='Markdown'
+                    parse_mode=ParseMode.MARKDOWN_V2
                 )
                 return REAUTH_CODE
             else:
                 await query.edit_message_text(
                     f"❌ Ошибка: {result['message']}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}")
                 )
                 return ConversationHandler.END
 
+        except asyncio.TimeoutError:
+            self.temp_data.pop(user_id, None)
+            await query.edit_message_text(
+                TIMEOUT_TEXT,
+                reply_markup=self._back_markup(f"session:{session_id}")
+            )
+            return ConversationHandler.END
+
         except Exception as e:
             await query.edit_message_text(
                 f"❌ Ошибка: {str(e)}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}")
             )
             return ConversationHandler.END
 
+    @per_user_serialized
     async def reauth_code(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive reauth code"""
         user_id = update.effective_user.id
         code = update.message.text.strip()
 
-        session_id = self.temp_data[user_id]['session_id']
-        session = db.get_session_by_id(session_id)
+        session_id = self.temp_data[user_id].session_id
+        session = await self._get_session(session_id)
 
         try:
-            result = await session_manager.authorize_session(session_id, session.phone, code=code)
+            result = await asyncio.wait_for(
+                session_manager.authorize_session(session_id, session.phone, code=code),
+                timeout=TELETHON_TIMEOUT
+            )
 
             if result['status'] == 'authorized':
                 await update.message.reply_text(
                     "✅ Сессия успешно переавторизована!",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« К сессии", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
                 )
                 return ConversationHandler.END
 
@@ -1241,136 +1350,154 @@ class ControlBot:
             else:
                 await update.message.reply_text(
                     f"❌ Ошибка: {result['message']}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« К сессии", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
                 )
                 return ConversationHandler.END
 
+        except asyncio.TimeoutError:
+            self.temp_data.pop(user_id, None)
+            await update.message.reply_text(
+                TIMEOUT_TEXT,
+                reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
+            )
+            return ConversationHandler.END
+
         except Exception as e:
             await update.message.reply_text(
                 f"❌ Ошибка: {str(e)}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« К сессии", callback_data=f"session_{session_id}")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
             )
             return ConversationHandler.END
 
+    @per_user_serialized
     async def reauth_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Receive reauth password"""
         user_id = update.effective_user.id
         password = update.message.text.strip()
 
-        session_id = self.temp_data[user_id]['session_id']
+        session_id = self.temp_data[user_id].session_id
 
         try:
-            result = await session_manager.authorize_session(session_id, None, password=password)
+            result = await asyncio.wait_for(
+                session_manager.authorize_session(session_id, None, password=password),
+                timeout=TELETHON_TIMEOUT
+            )
 
             if result['status'] == 'authorized':
                 await update.message.reply_text(
                     "✅ Сессия успешно переавторизована с 2FA!",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« К сессии", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
                 )
                 return ConversationHandler.END
             else:
                 await update.message.reply_text(
                     f"❌ Ошибка: {result['message']}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« К сессии", callback_data=f"session_{session_id}")
-                    ]])
+                    reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
                 )
                 return ConversationHandler.END
 
+        except asyncio.TimeoutError:
+            self.temp_data.pop(user_id, None)
+            await update.message.reply_text(
+                TIMEOUT_TEXT,
+                reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
+            )
+            return ConversationHandler.END
+
         except Exception as e:
             await update.message.reply_text(
                 f"❌ Ошибка: {str(e)}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« К сессии", callback_data=f"session_{session_id}")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}", "« К сессии")
             )
             return ConversationHandler.END
 
+    @per_user_serialized
     async def reauth_cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel reauthorization"""
         user_id = update.effective_user.id
 
-        session_id = None
-        if user_id in self.temp_data:
-            session_id = self.temp_data[user_id].get('session_id')
-            del self.temp_data[user_id]
+        data = self.temp_data.pop(user_id, None)
+        session_id = getattr(data, 'session_id', None)
 
         if update.message:
             await update.message.reply_text(
                 "❌ Переавторизация отменена.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}" if session_id else "main_sessions")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}" if session_id else "main_sessions")
             )
         elif update.callback_query:
             await update.callback_query.edit_message_text(
                 "❌ Переавторизация отменена.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("« Назад", callback_data=f"session_{session_id}" if session_id else "main_sessions")
-                ]])
+                reply_markup=self._back_markup(f"session:{session_id}" if session_id else "main_sessions")
             )
 
         return ConversationHandler.END
 
+    # ==================== Conversation Timeout ====================
+
+    @per_user_serialized
+    async def conversation_timeout(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Free temporary data of a conversation abandoned mid-way"""
+        self.temp_data.pop(update.effective_user.id, None)
+        return ConversationHandler.END
+
     # ==================== Callback Router ====================
 
+    def _build_dispatch(self) -> dict:
+        """Map callback operation names ("op" in "op:arg") to handlers"""
+        return {
+            # Main menu
+            "main_status": self.callback_main_status,
+            "main_sessions": self.callback_main_sessions,
+            "main_bots": self.callback_main_bots,
+            "main_health": self.callback_main_health,
+            "back_to_main": self.callback_back_to_main,
+
+            # Session management
+            "session": self.callback_session_detail,
+            "session_connect": self.callback_session_connect,
+            "session_disconnect": self.callback_session_disconnect,
+            "session_delete_confirm": self.callback_session_delete_confirm,
+            "session_delete": self.callback_session_delete,
+            "session_bots": self.callback_session_bots,
+
+            # Bot management
+            "bot": self.callback_bot_detail,
+            "bot_start": self.callback_bot_start,
+            "bot_stop": self.callback_bot_stop,
+            "bot_mode_list": functools.partial(self.callback_bot_mode_change, mode='list_only'),
+            "bot_mode_full": functools.partial(self.callback_bot_mode_change, mode='full_cycle'),
+            "bot_delete_confirm": self.callback_bot_delete_confirm,
+            "bot_delete": self.callback_bot_delete,
+        }
+
     async def callback_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Route callbacks to appropriate handlers"""
         query = update.callback_query
-        data = query.data
-
-        # Main menu
-        if data == "main_status":
-            await self.callback_main_status(update, context)
-        elif data == "main_sessions":
-            await self.callback_main_sessions(update, context)
-        elif data == "main_bots":
-            await self.callback_main_bots(update, context)
-        elif data == "main_health":
-            await self.callback_main_health(update, context)
-        elif data == "back_to_main":
-            await self.callback_back_to_main(update, context)
-
-        # Session management
-        elif data.startswith("session_") and not any([
-            data.startswith("session_bots_"),
-            data.startswith("session_connect_"),
-            data.startswith("session_disconnect_"),
-            data.startswith("session_delete_confirm_"),
-            data.startswith("session_delete_"),
-            data.startswith("session_reauth_")
-        ]):
-            await self.callback_session_detail(update, context)
-        elif data.startswith("session_connect_"):
-            await self.callback_session_connect(update, context)
-        elif data.startswith("session_disconnect_"):
-            await self.callback_session_disconnect(update, context)
-        elif data.startswith("session_delete_confirm_"):
-            await self.callback_session_delete_confirm(update, context)
-        elif data.startswith("session_delete_") and not data.startswith("session_delete_confirm_"):
-            await self.callback_session_delete(update, context)
-        elif data.startswith("session_bots_"):
-            await self.callback_session_bots(update, context)
-
-        # Bot management
-        elif data.startswith("bot_start_"):
-            await self.callback_bot_start(update, context)
-        elif data.startswith("bot_stop_"):
-            await self.callback_bot_stop(update, context)
-        elif data.startswith("bot_mode_"):
-            await self.callback_bot_mode_change(update, context)
-        elif data.startswith("bot_delete_confirm_"):
-            await self.callback_bot_delete_confirm(update, context)
-        elif data.startswith("bot_delete_") and not data.startswith("bot_delete_confirm_"):
-            await self.callback_bot_delete(update, context)
-        elif data.startswith("bot_"):
-            await self.callback_bot_detail(update, context)
+        op, _, arg = query.data.partition(':')
+
+        handler = self._dispatch.get(op)
+        if handler is None:
+            # Stale button from an older message layout
+            logger.debug(f"Unknown callback data: {query.data}")
+            await query.answer()
+            return
+
+        # Run off the update loop so a slow DB/Telethon call doesn't stall other chats
+        task = asyncio.create_task(self._run_callback(handler, update, context, arg))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
+    async def _run_callback(self, handler, update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str):
+        """Run a routed callback under the user's lock"""
+        try:
+            async with self._lock_for(update.effective_user.id):
+                await handler(update, context, arg)
+        except asyncio.CancelledError:
+            # Cancelled by post_shutdown; nothing left to report to the user
+            logger.debug(f"Callback {update.callback_query.data} cancelled on shutdown")
+        except Exception as e:
+            # Not awaited by PTB, so its error handlers never see this
+            logger.error(f"Callback {update.callback_query.data} failed: {e}", exc_info=True)
 
     # ==================== Run Bot ====================
 
@@ -1378,10 +1505,21 @@ class ControlBot:
         """Post-initialization callback"""
         # Initialize session manager
         await session_manager.initialize()
+        self._lock_cleanup_task = asyncio.create_task(self._lock_cleanup_loop())
         logger.info("Control bot initialized and ready")
 
     async def post_shutdown(self, application: Application):
         """Post-shutdown callback"""
+        # Cancel our own tasks before Telethon clients go away. Conversation
+        # handlers are PTB tasks and are already finished by the time we get here.
+        pending = list(self._bg_tasks)
+        if self._lock_cleanup_task:
+            pending.append(self._lock_cleanup_task)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
         # Shutdown session manager
         await session_manager.shutdown()
         logger.info("Control bot shut down")
@@ -1390,10 +1528,13 @@ class ControlBot:
         """Run the bot"""
         logger.info("Starting control bot...")
 
-        # Create application
+        # Create application (rate limiter smooths bursts of menu edits below Telegram's 30 msg/s cap).
+        # Updates are processed concurrently; per-user locks keep each user's steps in order.
         self.application = (
             Application.builder()
             .token(self.token)
+            .concurrent_updates(True)
+            .rate_limiter(AIORateLimiter(overall_max_rate=25, max_retries=3))
             .post_init(self.post_init)
             .post_shutdown(self.post_shutdown)
             .build()
@@ -1406,7 +1547,7 @@ class ControlBot:
         # Add session conversation
         add_session_conv = ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(self.add_session_start, pattern="^add_session_start$")
+                CallbackQueryHandler(self.add_session_start, pattern=_P_ADD_SESSION_START)
             ],
             states={
                 ADD_SESSION_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_session_phone)],
@@ -1414,65 +1555,73 @@ class ControlBot:
                 ADD_SESSION_API_HASH: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_session_api_hash)],
                 ADD_SESSION_CODE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_session_code)],
                 ADD_SESSION_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_session_password)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.conversation_timeout)],
             },
             fallbacks=[CommandHandler("cancel", self.add_session_cancel)],
             name="add_session",
-            persistent=False
+            persistent=False,
+            conversation_timeout=CONVERSATION_TIMEOUT
         )
         self.application.add_handler(add_session_conv)
 
         # Add bot conversation
         add_bot_conv = ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(self.add_bot_start, pattern="^add_bot_start_\d+$")
+                CallbackQueryHandler(self.add_bot_start, pattern=_P_ADD_BOT_START)
             ],
             states={
                 ADD_BOT_USERNAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_bot_username)],
                 ADD_BOT_MODE: [
-                    CallbackQueryHandler(self.add_bot_mode, pattern="^addbot_mode_(full|list)$")
+                    CallbackQueryHandler(self.add_bot_mode, pattern=_P_ADDBOT_MODE)
                 ],
                 ADD_BOT_STEP2_METHOD: [
-                    CallbackQueryHandler(self.add_bot_step2_method, pattern="^addbot_step2_(index|keywords|skip)$")
+                    CallbackQueryHandler(self.add_bot_step2_method, pattern=_P_ADDBOT_STEP2)
                 ],
                 ADD_BOT_STEP2_INDEX: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_bot_step2_index)],
                 ADD_BOT_STEP2_KEYWORDS: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.add_bot_step2_keywords)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.conversation_timeout)],
             },
             fallbacks=[CommandHandler("cancel", self.add_bot_cancel)],
             name="add_bot",
-            persistent=False
+            persistent=False,
+            conversation_timeout=CONVERSATION_TIMEOUT
         )
         self.application.add_handler(add_bot_conv)
 
         # Step 2 configuration conversation
         config_step2_conv = ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(self.config_step2_start, pattern="^config_step2_start_\d+$")
+                CallbackQueryHandler(self.config_step2_start, pattern=_P_CONFIG_STEP2_START)
             ],
             states={
                 CONFIG_STEP2_METHOD: [
-                    CallbackQueryHandler(self.config_step2_method, pattern="^config_step2_(index|keywords)$")
+                    CallbackQueryHandler(self.config_step2_method, pattern=_P_CONFIG_STEP2_METHOD)
                 ],
                 CONFIG_STEP2_INDEX: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.config_step2_index)],
                 CONFIG_STEP2_KEYWORDS: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.config_step2_keywords)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.conversation_timeout)],
             },
             fallbacks=[CommandHandler("cancel", self.config_step2_cancel)],
             name="config_step2",
-            persistent=False
+            persistent=False,
+            conversation_timeout=CONVERSATION_TIMEOUT
         )
         self.application.add_handler(config_step2_conv)
 
         # Reauthorization conversation
         reauth_conv = ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(self.reauth_start, pattern="^session_reauth_\d+$")
+                CallbackQueryHandler(self.reauth_start, pattern=_P_SESSION_REAUTH)
             ],
             states={
                 REAUTH_CODE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.reauth_code)],
                 REAUTH_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.reauth_password)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.conversation_timeout)],
             },
             fallbacks=[CommandHandler("cancel", self.reauth_cancel)],
             name="reauth",
-            persistent=False
+            persistent=False,
+            conversation_timeout=CONVERSATION_TIMEOUT
         )
         self.application.add_handler(reauth_conv)
 
@@ -1490,8 +1639,9 @@ def main():
     load_dotenv('.env.control_bot')
 
     BOT_TOKEN = os.getenv('CONTROL_BOT_TOKEN')
-    AUTHORIZED_IDS = os.getenv('AUTHORIZED_USER_IDS', '').split(',')
-    AUTHORIZED_IDS = [int(id.strip()) for id in AUTHORIZED_IDS if id.strip()]
+    AUTHORIZED_IDS = tuple(
+        int(user_id) for user_id in filter(None, map(str.strip, os.getenv('AUTHORIZED_USER_IDS', '').split(',')))
+    )
 
     if not BOT_TOKEN:
         raise ValueError("CONTROL_BOT_TOKEN not set in .env.control_bot")
@@ -1502,11 +1652,9 @@ def main():
     # Initialize database
     db.init_db()
 
-    # Add authorized users to database
-    for user_id in AUTHORIZED_IDS:
-        if not db.is_user_authorized(user_id):
-            db.add_authorized_user(user_id)
-            logger.info(f"Added authorized user: {user_id}")
+    # Add authorized users to database (single INSERT, existing users are skipped)
+    db.add_authorized_users_bulk(AUTHORIZED_IDS)
+    logger.info(f"Authorized users: {len(AUTHORIZED_IDS)}")
 
     # Create and run bot
     bot = ControlBot(BOT_TOKEN, AUTHORIZED_IDS)
@@ -2,12 +2,38 @@
 Database manager for the control panel.
 """
 import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session as DBSession
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import create_engine, event, select, update, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker, scoped_session, selectinload, raiseload, Session as DBSession
+from sqlalchemy.pool import QueuePool
 from models import Base, Session, TargetBot, Statistics, AuthorizedUser
 
+# Statistics columns that hold counters and may be incremented
+STATISTICS_COUNTERS = frozenset({
+    'total_runs', 'successful_runs', 'failed_runs',
+    'total_clicks', 'successful_clicks', 'failed_clicks',
+    'triggers_detected'
+})
+
+# Seconds an is_user_authorized result is served from memory
+AUTH_CACHE_TTL = 60
+
+# Set DB_RAISELOAD=1 to make any lazy relationship load on list queries raise
+RAISE_ON_LAZY_LOAD = os.getenv('DB_RAISELOAD') == '1'
+
+
+def _eager(*loaders):
+    """Loader options for list queries, optionally forbidding other lazy loads"""
+    if RAISE_ON_LAZY_LOAD:
+        return (*loaders, raiseload('*'))
+    return loaders
+
 
 class Database:
     """Database manager for SQLite operations"""
@@ -20,18 +46,72 @@ class Database:
             db_path: Path to SQLite database file
         """
         self.db_path = db_path
-        self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        # Pooled connections are shared between the event loop and
+        # asyncio.to_thread workers, hence check_same_thread=False.
+        self.engine = create_engine(
+            f'sqlite:///{db_path}',
+            echo=False,
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10,
+            connect_args={'check_same_thread': False}
+        )
+        event.listen(self.engine, 'connect', self._set_sqlite_pragmas)
+        self.SessionLocal = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+
+        # Statistics increments buffered until flush_statistics() (bot_id -> field -> amount)
+        self._pending_increments: Dict[int, Counter] = defaultdict(Counter)
+        self._pending_lock = threading.Lock()
+
+        # telegram_id -> (checked_at, authorized), see AUTH_CACHE_TTL
+        self._auth_cache: Dict[int, Tuple[float, bool]] = {}
+
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Tune every new SQLite connection for the frequent statistics writes"""
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.execute('PRAGMA cache_size=-65536')
+            cursor.execute('PRAGMA mmap_size=268435456')
+        finally:
+            cursor.close()
 
     def init_db(self):
-        """Create all tables if they don't exist"""
+        """Create all tables and indexes if they don't exist"""
         Base.metadata.create_all(self.engine)
+
+        # create_all skips indexes of tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
         print(f"Database initialized at: {self.db_path}")
 
     def get_session(self) -> DBSession:
-        """Get a new database session"""
+        """Get the database session of the current thread"""
         return self.SessionLocal()
 
+    @contextmanager
+    def _session(self) -> Iterator[DBSession]:
+        """
+        Transactional scope around the thread's session.
+
+        Commits on success, rolls back on error and always returns the
+        connection to the pool. Objects stay usable after the block since
+        the session does not expire them on commit.
+        """
+        db = self.SessionLocal()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
     # ==================== Session CRUD ====================
 
     def add_session(self, phone: str, api_id: int, api_hash: str, session_file: str) -> Session:
@@ -47,8 +127,7 @@ class Database:
         Returns:
             Created Session object
         """
-        db = self.get_session()
-        try:
+        with self._session() as db:
             session = Session(
                 phone=phone,
                 api_id=api_id,
@@ -56,62 +135,62 @@ class Database:
                 session_file=session_file
             )
             db.add(session)
-            db.commit()
-            db.refresh(session)
+            db.flush()
             return session
-        finally:
-            db.close()
+
+    def add_sessions_bulk(self, rows: List[dict]):
+        """
+        Add several Telegram sessions in one transaction.
+
+        Args:
+            rows: Dicts with phone, api_id, api_hash and session_file keys
+        """
+        if not rows:
+            return
+
+        with self._session() as db:
+            db.bulk_insert_mappings(Session, rows)
 
     def get_session_by_id(self, session_id: int) -> Optional[Session]:
         """Get session by ID"""
-        db = self.get_session()
-        try:
-            return db.query(Session).filter(Session.id == session_id).first()
-        finally:
-            db.close()
+        with self._session() as db:
+            return db.get(Session, session_id)
 
     def get_session_by_phone(self, phone: str) -> Optional[Session]:
         """Get session by phone number"""
-        db = self.get_session()
-        try:
+        with self._session() as db:
             return db.query(Session).filter(Session.phone == phone).first()
-        finally:
-            db.close()
 
     def get_all_sessions(self, active_only: bool = False) -> List[Session]:
-        """Get all sessions"""
-        db = self.get_session()
-        try:
-            query = db.query(Session)
+        """Get all sessions with their bots and bot statistics loaded"""
+        with self._session() as db:
+            query = db.query(Session).options(*_eager(
+                selectinload(Session.target_bots).selectinload(TargetBot.statistics)
+            ))
             if active_only:
                 query = query.filter(Session.is_active == True)
             return query.all()
-        finally:
-            db.close()
+
+    def count_sessions(self) -> int:
+        """Get total number of sessions"""
+        with self._session() as db:
+            return db.query(Session).count()
 
     def update_session_status(self, session_id: int, is_active: bool):
         """Update session active status"""
-        db = self.get_session()
-        try:
-            session = db.query(Session).filter(Session.id == session_id).first()
+        with self._session() as db:
+            session = db.get(Session, session_id)
             if session:
                 session.is_active = is_active
                 if is_active:
                     session.last_connected_at = datetime.utcnow()
-                db.commit()
-        finally:
-            db.close()
 
     def delete_session(self, session_id: int):
         """Delete a session and all related data"""
-        db = self.get_session()
-        try:
-            session = db.query(Session).filter(Session.id == session_id).first()
+        with self._session() as db:
+            session = db.get(Session, session_id)
             if session:
                 db.delete(session)
-                db.commit()
-        finally:
-            db.close()
 
     # ==================== TargetBot CRUD ====================
 
@@ -127,76 +206,106 @@ class Database:
         Returns:
             Created TargetBot object
         """
-        db = self.get_session()
-        try:
+        with self._session() as db:
             bot = TargetBot(
                 session_id=session_id,
                 bot_username=bot_username,
                 automation_mode=automation_mode
             )
             db.add(bot)
-            db.commit()
-            db.refresh(bot)
+            db.flush()
 
             # Create statistics entry
             stats = Statistics(bot_id=bot.id)
             db.add(stats)
-            db.commit()
 
             return bot
-        finally:
-            db.close()
+
+    def add_target_bots_bulk(self, rows: List[dict]) -> List[int]:
+        """
+        Add several target bots and their statistics entries in one transaction.
+
+        Args:
+            rows: Dicts with session_id, bot_username and optionally automation_mode keys
+
+        Returns:
+            IDs of the created bots
+        """
+        if not rows:
+            return []
+
+        # Copies, since return_defaults writes the generated IDs into the dicts
+        rows = [dict(row) for row in rows]
+        with self._session() as db:
+            db.bulk_insert_mappings(TargetBot, rows, return_defaults=True)
+            bot_ids = [row['id'] for row in rows]
+            db.bulk_insert_mappings(Statistics, [{'bot_id': bot_id} for bot_id in bot_ids])
+        return bot_ids
 
     def get_bot_by_id(self, bot_id: int) -> Optional[TargetBot]:
         """Get target bot by ID"""
-        db = self.get_session()
-        try:
-            return db.query(TargetBot).filter(TargetBot.id == bot_id).first()
-        finally:
-            db.close()
+        with self._session() as db:
+            return db.get(TargetBot, bot_id)
+
+    def get_bot_by_session_and_username(self, session_id: int, bot_username: str) -> Optional[TargetBot]:
+        """Get a session's target bot by username"""
+        with self._session() as db:
+            return db.query(TargetBot).filter(
+                TargetBot.session_id == session_id,
+                TargetBot.bot_username == bot_username
+            ).first()
 
     def get_bots_by_session(self, session_id: int) -> List[TargetBot]:
-        """Get all bots for a session"""
-        db = self.get_session()
-        try:
-            return db.query(TargetBot).filter(TargetBot.session_id == session_id).all()
-        finally:
-            db.close()
+        """Get all bots for a session with their statistics loaded"""
+        with self._session() as db:
+            return (
+                db.query(TargetBot)
+                .options(*_eager(selectinload(TargetBot.statistics)))
+                .filter(TargetBot.session_id == session_id)
+                .all()
+            )
 
     def get_all_bots(self, enabled_only: bool = False) -> List[TargetBot]:
-        """Get all target bots"""
-        db = self.get_session()
-        try:
-            query = db.query(TargetBot)
+        """Get all target bots with their session and statistics loaded"""
+        with self._session() as db:
+            query = db.query(TargetBot).options(*_eager(
+                selectinload(TargetBot.statistics),
+                selectinload(TargetBot.session)
+            ))
             if enabled_only:
                 query = query.filter(TargetBot.automation_enabled == True)
             return query.all()
-        finally:
-            db.close()
+
+    def iter_all_bots(self, enabled_only: bool = False, batch_size: int = 200) -> Iterator[TargetBot]:
+        """
+        Iterate over target bots, fetching batch_size rows at a time.
+
+        Uses its own session rather than the thread's scoped one, so other
+        Database calls made while iterating do not close it.
+        """
+        stmt = select(TargetBot).options(selectinload(TargetBot.statistics))
+        if enabled_only:
+            stmt = stmt.where(TargetBot.automation_enabled == True)
+        stmt = stmt.execution_options(stream_results=True, yield_per=batch_size)
+
+        with self.SessionLocal.session_factory() as db:
+            yield from db.scalars(stmt)
 
     def update_bot_status(self, bot_id: int, enabled: bool):
         """Update bot automation enabled status"""
-        db = self.get_session()
-        try:
-            bot = db.query(TargetBot).filter(TargetBot.id == bot_id).first()
+        with self._session() as db:
+            bot = db.get(TargetBot, bot_id)
             if bot:
                 bot.automation_enabled = enabled
                 bot.updated_at = datetime.utcnow()
-                db.commit()
-        finally:
-            db.close()
 
     def update_bot_mode(self, bot_id: int, mode: str):
         """Update bot automation mode"""
-        db = self.get_session()
-        try:
-            bot = db.query(TargetBot).filter(TargetBot.id == bot_id).first()
+        with self._session() as db:
+            bot = db.get(TargetBot, bot_id)
             if bot:
                 bot.automation_mode = mode
                 bot.updated_at = datetime.utcnow()
-                db.commit()
-        finally:
-            db.close()
 
     def update_bot_step2_config(self, bot_id: int, keywords: str = None, button_index: int = 0):
         """
@@ -207,37 +316,53 @@ class Database:
             keywords: Comma-separated keywords or None for index-based selection
             button_index: Button index (0 = first button)
         """
-        db = self.get_session()
-        try:
-            bot = db.query(TargetBot).filter(TargetBot.id == bot_id).first()
+        with self._session() as db:
+            bot = db.get(TargetBot, bot_id)
             if bot:
                 bot.step2_button_keywords = keywords
                 bot.step2_button_index = button_index
                 bot.updated_at = datetime.utcnow()
-                db.commit()
-        finally:
-            db.close()
 
     def delete_bot(self, bot_id: int):
         """Delete a target bot"""
-        db = self.get_session()
-        try:
-            bot = db.query(TargetBot).filter(TargetBot.id == bot_id).first()
+        with self._session() as db:
+            bot = db.get(TargetBot, bot_id)
             if bot:
                 db.delete(bot)
-                db.commit()
-        finally:
-            db.close()
 
     # ==================== Statistics CRUD ====================
 
     def get_statistics(self, bot_id: int) -> Optional[Statistics]:
         """Get statistics for a bot"""
-        db = self.get_session()
-        try:
+        with self._session() as db:
             return db.query(Statistics).filter(Statistics.bot_id == bot_id).first()
-        finally:
-            db.close()
+
+    def get_unhealthy_bots(self, min_runs: int = 10, min_success_rate: float = 50.0) -> List[Tuple[TargetBot, Optional[Statistics]]]:
+        """
+        Get bots that may need attention in a health check.
+
+        Returns bots with a low success rate (over more than min_runs runs)
+        and all enabled bots - whether an enabled bot is actually running is
+        only known to the session manager, so the caller filters those.
+
+        Args:
+            min_runs: Success rate is only judged above this many runs
+            min_success_rate: Success rate threshold in percent
+
+        Returns:
+            List of (TargetBot, Statistics) tuples
+        """
+        with self._session() as db:
+            low_success = and_(
+                Statistics.total_runs > min_runs,
+                Statistics.successful_runs * 100 < Statistics.total_runs * min_success_rate
+            )
+            return (
+                db.query(TargetBot, Statistics)
+                .outerjoin(Statistics, Statistics.bot_id == TargetBot.id)
+                .filter(or_(TargetBot.automation_enabled == True, low_success))
+                .all()
+            )
 
     def update_statistics(self, bot_id: int, **kwargs):
         """
@@ -247,84 +372,155 @@ class Database:
                         total_clicks, successful_clicks, failed_clicks,
                         triggers_detected, last_error
         """
-        db = self.get_session()
-        try:
-            stats = db.query(Statistics).filter(Statistics.bot_id == bot_id).first()
-            if stats:
-                for key, value in kwargs.items():
-                    if hasattr(stats, key):
-                        setattr(stats, key, value)
+        now = datetime.utcnow()
+        values = {
+            key: value for key, value in kwargs.items()
+            if key in STATISTICS_COUNTERS or key == 'last_error'
+        }
+        values['last_activity_at'] = now
+        if 'last_error' in kwargs:
+            values['last_error_at'] = now
+
+        with self._session() as db:
+            db.execute(
+                update(Statistics)
+                .where(Statistics.bot_id == bot_id)
+                .values(values)
+            )
 
-                stats.last_activity_at = datetime.utcnow()
+    def increment_statistics(self, bot_id: int, field: str, amount: int = 1):
+        """
+        Increment a statistics counter field.
 
-                if 'last_error' in kwargs:
-                    stats.last_error_at = datetime.utcnow()
+        The increment is only buffered in memory; it reaches the database
+        with the next flush_statistics() call. Unknown fields raise ValueError.
+        """
+        if field not in STATISTICS_COUNTERS:
+            raise ValueError(f"Unknown statistics counter: {field}")
 
-                db.commit()
-        finally:
-            db.close()
+        with self._pending_lock:
+            self._pending_increments[bot_id][field] += amount
 
-    def increment_statistics(self, bot_id: int, field: str, amount: int = 1):
-        """Increment a statistics field"""
-        db = self.get_session()
+    def flush_statistics(self):
+        """Write buffered statistics increments, one UPDATE per bot"""
+        with self._pending_lock:
+            pending = self._pending_increments
+            self._pending_increments = defaultdict(Counter)
+
+        if not pending:
+            return
+
+        now = datetime.utcnow()
         try:
-            stats = db.query(Statistics).filter(Statistics.bot_id == bot_id).first()
-            if stats and hasattr(stats, field):
-                current_value = getattr(stats, field) or 0
-                setattr(stats, field, current_value + amount)
-                stats.last_activity_at = datetime.utcnow()
-                db.commit()
-        finally:
-            db.close()
+            with self._session() as db:
+                for bot_id, increments in pending.items():
+                    values = {
+                        field: getattr(Statistics, field) + amount
+                        for field, amount in increments.items()
+                    }
+                    values['last_activity_at'] = now
+                    db.execute(
+                        update(Statistics)
+                        .where(Statistics.bot_id == bot_id)
+                        .values(values)
+                    )
+        except Exception:
+            # Put the increments back so the next flush retries them
+            with self._pending_lock:
+                for bot_id, increments in pending.items():
+                    self._pending_increments[bot_id].update(increments)
+            raise
 
     # ==================== AuthorizedUser CRUD ====================
 
     def add_authorized_user(self, telegram_id: int, username: str = None, first_name: str = None) -> AuthorizedUser:
         """Add an authorized user"""
-        db = self.get_session()
-        try:
+        with self._session() as db:
             user = AuthorizedUser(
                 telegram_id=telegram_id,
                 username=username,
                 first_name=first_name
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
-            return user
-        finally:
-            db.close()
+            db.flush()
+        self._auth_cache.pop(telegram_id, None)
+        return user
+
+    def add_authorized_users_bulk(self, telegram_ids: Iterable[int]):
+        """
+        Add several authorized users in one statement, skipping existing ones.
+
+        Args:
+            telegram_ids: Telegram user IDs
+        """
+        telegram_ids = list(telegram_ids)
+        rows = [{'telegram_id': telegram_id} for telegram_id in telegram_ids]
+        if not rows:
+            return
+
+        with self._session() as db:
+            db.execute(
+                sqlite_insert(AuthorizedUser)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=['telegram_id'])
+            )
+        for telegram_id in telegram_ids:
+            self._auth_cache.pop(telegram_id, None)
 
     def is_user_authorized(self, telegram_id: int) -> bool:
-        """Check if user is authorized"""
-        db = self.get_session()
-        try:
+        """Check if user is authorized (cached for AUTH_CACHE_TTL seconds)"""
+        cached = self._auth_cache.get(telegram_id)
+        if cached and time.monotonic() - cached[0] < AUTH_CACHE_TTL:
+            return cached[1]
+
+        with self._session() as db:
             user = db.query(AuthorizedUser).filter(
                 AuthorizedUser.telegram_id == telegram_id,
                 AuthorizedUser.is_active == True
             ).first()
-            return user is not None
-        finally:
-            db.close()
+        authorized = user is not None
+        self._auth_cache[telegram_id] = (time.monotonic(), authorized)
+        return authorized
+
+    def filter_authorized(self, telegram_ids: Iterable[int]) -> Set[int]:
+        """
+        Get the authorized subset of several users with one query.
+
+        Args:
+            telegram_ids: Telegram user IDs to check
+
+        Returns:
+            Set of IDs that belong to active authorized users
+        """
+        telegram_ids = set(telegram_ids)
+        if not telegram_ids:
+            return set()
+
+        with self._session() as db:
+            authorized = set(db.scalars(
+                select(AuthorizedUser.telegram_id).where(
+                    AuthorizedUser.telegram_id.in_(telegram_ids),
+                    AuthorizedUser.is_active == True
+                )
+            ))
+
+        checked_at = time.monotonic()
+        for telegram_id in telegram_ids:
+            self._auth_cache[telegram_id] = (checked_at, telegram_id in authorized)
+        return authorized
 
     def get_all_authorized_users(self) -> List[AuthorizedUser]:
         """Get all authorized users"""
-        db = self.get_session()
-        try:
+        with self._session() as db:
             return db.query(AuthorizedUser).filter(AuthorizedUser.is_active == True).all()
-        finally:
-            db.close()
 
     def remove_authorized_user(self, telegram_id: int):
         """Remove an authorized user"""
-        db = self.get_session()
-        try:
+        with self._session() as db:
             user = db.query(AuthorizedUser).filter(AuthorizedUser.telegram_id == telegram_id).first()
             if user:
                 user.is_active = False
-                db.commit()
-        finally:
-            db.close()
+        self._auth_cache.pop(telegram_id, None)
 
 
 # Global database instance
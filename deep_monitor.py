@@ -7,8 +7,13 @@
 
 import asyncio
 import logging
+import logging.handlers
+import queue
+import re
+import sqlite3
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Deque, Tuple
 from telethon import TelegramClient, events
 from telethon.tl.custom import Message
 from telethon.tl.types import KeyboardButtonCallback
@@ -24,18 +29,41 @@ SESSION_NAME = 'deep_monitor_session'
 
 # Триггеры для отслеживания
 TRIGGER_TEXTS = ['Появились новые перевозки', 'новые перевозки', 'перевозки']
+TRIGGER_RE = re.compile('|'.join(re.escape(t) for t in TRIGGER_TEXTS), re.IGNORECASE)
+
+# Ограничения истории: событий на сообщение и отслеживаемых сообщений
+HISTORY_PER_MESSAGE = 16
+HISTORY_MAX_MESSAGES = 4096
+
+# Хранилище событий для последующего анализа задержек
+MONITOR_DB = 'monitor.db'
+EVENT_FLUSH_INTERVAL = 1.0  # секунд между пакетными записями
+
+# Рамка статистики
+BANNER_WIDTH = 68
+BANNER_TOP = '╔' + '═'*BANNER_WIDTH + '╗'
+BANNER_HEAVY_SEP = '╠' + '═'*BANNER_WIDTH + '╣'
+BANNER_SEP = '╠' + '─'*BANNER_WIDTH + '╣'
+BANNER_BOTTOM = '╚' + '═'*BANNER_WIDTH + '╝'
+EVENT_TOP = '┌' + '─'*BANNER_WIDTH + '┐'
+EVENT_BOTTOM = '└' + '─'*BANNER_WIDTH + '┘'
 
 # ============================================================================
 # ЛОГИРОВАНИЕ
 # ============================================================================
+# Записи форматируются в QueueHandler, а пишутся в файл/консоль фоновым
+# потоком QueueListener - обработчики Telethon не ждут дискового I/O
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(
+    log_queue,
+    logging.FileHandler('deep_monitor.log', encoding='utf-8'),
+    logging.StreamHandler()
+)
 logging.basicConfig(
     format='%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s',
     datefmt='%H:%M:%S',
     level=logging.INFO,
-    handlers=[
-        logging.FileHandler('deep_monitor.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 logging.getLogger('telethon').setLevel(logging.WARNING)
@@ -50,20 +78,26 @@ class DeepMonitor:
 
         # Отслеживание сообщений
         self.last_message_time: Optional[datetime] = None
-        self.message_history: Dict[int, List[Dict]] = {}  # message_id -> list of events
+        self.message_history: 'OrderedDict[int, Deque[Dict]]' = OrderedDict()  # message_id -> последние события
+
+        # События, ожидающие записи в MONITOR_DB:
+        # (ts, message_id, kind, delay_ms, has_buttons, is_trigger, text)
+        self.event_conn: Optional[sqlite3.Connection] = None
+        self.event_buffer: List[Tuple] = []
 
         # Статистика
         self.stats = {
-            'total_messages': 0,
             'new_messages': 0,
             'edits': 0,
             'triggers_detected': 0,
-            'messages_with_buttons': 0,
-            'messages_without_buttons': 0,
+            'messages_with_buttons': 0,  # без кнопок = всего событий - с кнопками
             'start_time': datetime.now(),
 
-            # Задержки
-            'edit_delays': [],  # Задержки между редактированиями
+            # Задержки между редактированиями (накопительные агрегаты)
+            'edit_delay_count': 0,
+            'edit_delay_sum': 0.0,
+            'edit_delay_min': float('inf'),
+            'edit_delay_max': 0.0,
             'response_times': [],  # Время отклика бота
 
             # Кнопки
@@ -80,6 +114,8 @@ class DeepMonitor:
         logger.info(f'Режим: ТОЛЬКО НАБЛЮДЕНИЕ (не нажимает кнопки)')
         logger.info('='*70)
 
+        self.open_event_store()
+
         # Инициализация клиента
         self.client = TelegramClient(SESSION_NAME, API_ID, PHONE)
         await self.client.start(phone=PHONE)
@@ -109,8 +145,9 @@ class DeepMonitor:
         logger.info('   Триггеры: ' + ', '.join(f'"{t}"' for t in TRIGGER_TEXTS))
         logger.info('')
 
-        # Запуск периодической статистики
+        # Запуск периодической статистики и записи событий
         asyncio.create_task(self.periodic_stats())
+        asyncio.create_task(self.periodic_event_flush())
 
         # Запуск клиента
         await self.client.run_until_disconnected()
@@ -120,7 +157,6 @@ class DeepMonitor:
         message = event.message
         now = datetime.now()
 
-        self.stats['total_messages'] += 1
         self.stats['new_messages'] += 1
 
         # Время с последнего сообщения
@@ -135,8 +171,7 @@ class DeepMonitor:
 
         if has_buttons:
             self.stats['messages_with_buttons'] += 1
-        else:
-            self.stats['messages_without_buttons'] += 1
+            self.stats['button_texts_seen'].update(btn['text'] for btn in buttons)
 
         # Сохранение в историю
         event_data = {
@@ -146,46 +181,48 @@ class DeepMonitor:
             'buttons': buttons,
             'has_buttons': has_buttons
         }
-
-        if message.id not in self.message_history:
-            self.message_history[message.id] = []
-        self.message_history[message.id].append(event_data)
+        self.remember_event(message.id, event_data)
 
         # Проверка на триггер
         is_trigger = self.check_trigger(message.text)
         if is_trigger:
             self.stats['triggers_detected'] += 1
 
-        # Логирование
+        self.event_buffer.append(
+            (now.timestamp(), message.id, 'NEW', None, has_buttons, is_trigger, message.text)
+        )
+
+        # Логирование (баннер не собирается, если INFO отключен)
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
         logger.info('')
-        logger.info('┌' + '─'*68 + '┐')
-        logger.info(f'│ 🆕 НОВОЕ СООБЩЕНИЕ (ID: {message.id})')
+        logger.info(EVENT_TOP)
+        logger.info('│ 🆕 НОВОЕ СООБЩЕНИЕ (ID: %s)', message.id)
         if time_since_last:
-            logger.info(f'│ ⏱️  Время с последнего: {time_since_last:.1f} мс')
+            logger.info('│ ⏱️  Время с последнего: %.1f мс', time_since_last)
 
         if is_trigger:
-            logger.info(f'│ 🚨 ОБНАРУЖЕН ТРИГГЕР!')
+            logger.info('│ 🚨 ОБНАРУЖЕН ТРИГГЕР!')
 
         if message.text:
             text_preview = message.text[:60] + '...' if len(message.text) > 60 else message.text
-            logger.info(f'│ 📝 Текст: {text_preview}')
+            logger.info('│ 📝 Текст: %s', text_preview)
 
-        logger.info(f'│ 🎛️  Кнопок: {len(buttons)}')
+        logger.info('│ 🎛️  Кнопок: %d', len(buttons))
 
         if buttons:
             logger.info('│ 📋 Кнопки:')
             for idx, btn in enumerate(buttons, 1):
-                self.stats['button_texts_seen'].add(btn['text'])
-                logger.info(f'│    [{idx}] {btn["text"]}')
+                logger.info('│    [%d] %s', idx, btn['text'])
 
-        logger.info('└' + '─'*68 + '┘')
+        logger.info(EVENT_BOTTOM)
 
     async def handle_edit(self, event):
         """Обработка редактирования сообщения"""
         message = event.message
         now = datetime.now()
 
-        self.stats['total_messages'] += 1
         self.stats['edits'] += 1
 
         # Извлечение данных
@@ -194,15 +231,21 @@ class DeepMonitor:
 
         if has_buttons:
             self.stats['messages_with_buttons'] += 1
-        else:
-            self.stats['messages_without_buttons'] += 1
+            self.stats['button_texts_seen'].update(btn['text'] for btn in buttons)
 
         # Вычисление задержки с предыдущим событием
         delay = None
-        if message.id in self.message_history and self.message_history[message.id]:
-            last_event = self.message_history[message.id][-1]
+        previous = self.message_history.get(message.id)
+        if previous:
+            last_event = previous[-1]
             delay = (now - last_event['time']).total_seconds() * 1000
-            self.stats['edit_delays'].append(delay)
+            stats = self.stats
+            stats['edit_delay_count'] += 1
+            stats['edit_delay_sum'] += delay
+            if delay < stats['edit_delay_min']:
+                stats['edit_delay_min'] = delay
+            if delay > stats['edit_delay_max']:
+                stats['edit_delay_max'] = delay
 
         # Сохранение в историю
         event_data = {
@@ -213,21 +256,25 @@ class DeepMonitor:
             'has_buttons': has_buttons,
             'delay_from_previous': delay
         }
-
-        if message.id not in self.message_history:
-            self.message_history[message.id] = []
-        self.message_history[message.id].append(event_data)
+        self.remember_event(message.id, event_data)
 
         # Проверка на триггер
         is_trigger = self.check_trigger(message.text)
 
-        # Логирование
+        self.event_buffer.append(
+            (now.timestamp(), message.id, 'EDIT', delay, has_buttons, is_trigger, message.text)
+        )
+
+        # Логирование (баннер не собирается, если INFO отключен)
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
         logger.info('')
-        logger.info('┌' + '─'*68 + '┐')
-        logger.info(f'│ ✏️  РЕДАКТИРОВАНИЕ (ID: {message.id})')
+        logger.info(EVENT_TOP)
+        logger.info('│ ✏️  РЕДАКТИРОВАНИЕ (ID: %s)', message.id)
 
         if delay:
-            logger.info(f'│ ⏱️  Задержка с предыдущего: {delay:.1f} мс')
+            logger.info('│ ⏱️  Задержка с предыдущего: %.1f мс', delay)
 
             # Анализ паттерна
             history = self.message_history[message.id]
@@ -236,47 +283,97 @@ class DeepMonitor:
                 curr_has_buttons = has_buttons
 
                 if not prev_had_buttons and curr_has_buttons:
-                    logger.info(f'│ 🔄 ПАТТЕРН: Без кнопок → С кнопками ({delay:.1f} мс)')
+                    logger.info('│ 🔄 ПАТТЕРН: Без кнопок → С кнопками (%.1f мс)', delay)
                 elif prev_had_buttons and not curr_has_buttons:
-                    logger.info(f'│ 🔄 ПАТТЕРН: С кнопками → Без кнопок ({delay:.1f} мс)')
+                    logger.info('│ 🔄 ПАТТЕРН: С кнопками → Без кнопок (%.1f мс)', delay)
 
         if is_trigger:
-            logger.info(f'│ 🚨 ОБНАРУЖЕН ТРИГГЕР!')
+            logger.info('│ 🚨 ОБНАРУЖЕН ТРИГГЕР!')
 
         if message.text:
             text_preview = message.text[:60] + '...' if len(message.text) > 60 else message.text
-            logger.info(f'│ 📝 Текст: {text_preview}')
+            logger.info('│ 📝 Текст: %s', text_preview)
 
-        logger.info(f'│ 🎛️  Кнопок: {len(buttons)}')
+        logger.info('│ 🎛️  Кнопок: %d', len(buttons))
 
         if buttons:
             logger.info('│ 📋 Кнопки:')
             for idx, btn in enumerate(buttons, 1):
-                self.stats['button_texts_seen'].add(btn['text'])
-                logger.info(f'│    [{idx}] {btn["text"]}')
+                logger.info('│    [%d] %s', idx, btn['text'])
+
+        logger.info(EVENT_BOTTOM)
+
+    def open_event_store(self):
+        """Открытие SQLite-хранилища событий"""
+        self.event_conn = sqlite3.connect(MONITOR_DB, check_same_thread=False)
+        self.event_conn.execute('PRAGMA journal_mode=WAL')
+        self.event_conn.execute(
+            'CREATE TABLE IF NOT EXISTS events('
+            'ts REAL, mid INTEGER, kind TEXT, delay REAL, '
+            'has_buttons INTEGER, is_trigger INTEGER, text TEXT)'
+        )
+        self.event_conn.commit()
+
+    def write_events(self, rows: List[Tuple]):
+        """Запись пакета событий одной транзакцией"""
+        with self.event_conn:
+            self.event_conn.executemany('INSERT INTO events VALUES(?,?,?,?,?,?,?)', rows)
 
-        logger.info('└' + '─'*68 + '┘')
+    async def flush_events(self):
+        """Сброс накопленных событий в MONITOR_DB"""
+        if not self.event_buffer or self.event_conn is None:
+            return
+        rows, self.event_buffer = self.event_buffer, []
+        await asyncio.to_thread(self.write_events, rows)
+
+    async def periodic_event_flush(self):
+        """Периодическая пакетная запись событий"""
+        while True:
+            await asyncio.sleep(EVENT_FLUSH_INTERVAL)
+            try:
+                await self.flush_events()
+            except sqlite3.Error as e:
+                logger.error(f'❌ Ошибка записи событий: {e}')
+
+    def close_event_store(self):
+        """Запись оставшихся событий и закрытие хранилища"""
+        if self.event_conn is None:
+            return
+        if self.event_buffer:
+            self.write_events(self.event_buffer)
+            self.event_buffer = []
+        self.event_conn.close()
+        self.event_conn = None
+
+    def remember_event(self, message_id: int, event_data: Dict):
+        """Сохранение события в ограниченную историю (LRU по сообщениям)"""
+        history = self.message_history.get(message_id)
+        if history is None:
+            history = self.message_history[message_id] = deque(maxlen=HISTORY_PER_MESSAGE)
+        else:
+            self.message_history.move_to_end(message_id)
+        history.append(event_data)
+
+        if len(self.message_history) > HISTORY_MAX_MESSAGES:
+            self.message_history.popitem(last=False)
 
     def extract_buttons(self, message: Message) -> List[Dict]:
-        """Извлечение кнопок из сообщения"""
-        buttons = []
-        if message.reply_markup and message.reply_markup.rows:
-            for row_idx, row in enumerate(message.reply_markup.rows):
-                for col_idx, button in enumerate(row.buttons):
-                    if isinstance(button, KeyboardButtonCallback):
-                        buttons.append({
-                            'text': button.text,
-                            'row': row_idx,
-                            'col': col_idx
-                        })
-        return buttons
+        """Извлечение callback-кнопок из сообщения"""
+        markup = message.reply_markup
+        if not (markup and markup.rows):
+            return []
+
+        callback_type = KeyboardButtonCallback
+        return [
+            {'text': button.text, 'row': row_idx, 'col': col_idx}
+            for row_idx, row in enumerate(markup.rows)
+            for col_idx, button in enumerate(row.buttons)
+            if type(button) is callback_type
+        ]
 
     def check_trigger(self, text: Optional[str]) -> bool:
         """Проверка на триггер"""
-        if not text:
-            return False
-        text_lower = text.lower()
-        return any(trigger.lower() in text_lower for trigger in TRIGGER_TEXTS)
+        return bool(text and TRIGGER_RE.search(text))
 
     async def periodic_stats(self):
         """Периодический вывод статистики"""
@@ -286,46 +383,57 @@ class DeepMonitor:
             self.print_stats()
             await asyncio.sleep(300)  # Каждые 5 минут
 
+    @staticmethod
+    def _row(label: str, value='') -> str:
+        """Строка рамки статистики, дополненная пробелами до ширины"""
+        return f'║{f" {label}{value}":<{BANNER_WIDTH}}║'
+
     def print_stats(self):
-        """Вывод статистики"""
+        """Вывод статистики (одной записью лога)"""
         runtime = datetime.now() - self.stats['start_time']
-
-        logger.info('')
-        logger.info('╔' + '═'*68 + '╗')
-        logger.info('║' + ' '*22 + '📊 СТАТИСТИКА' + ' '*33 + '║')
-        logger.info('╠' + '═'*68 + '╣')
-        logger.info(f'║ Время работы: {str(runtime).split(".")[0]}' + ' '*(68-len(str(runtime).split(".")[0])-16) + '║')
-        logger.info('╠' + '─'*68 + '╣')
-        logger.info(f'║ Всего событий: {self.stats["total_messages"]}' + ' '*(68-len(str(self.stats["total_messages"]))-19) + '║')
-        logger.info(f'║   • Новые сообщения: {self.stats["new_messages"]}' + ' '*(68-len(str(self.stats["new_messages"]))-23) + '║')
-        logger.info(f'║   • Редактирования: {self.stats["edits"]}' + ' '*(68-len(str(self.stats["edits"]))-22) + '║')
-        logger.info(f'║ Триггеров: {self.stats["triggers_detected"]}' + ' '*(68-len(str(self.stats["triggers_detected"]))-14) + '║')
-        logger.info('╠' + '─'*68 + '╣')
-        logger.info(f'║ Сообщений с кнопками: {self.stats["messages_with_buttons"]}' + ' '*(68-len(str(self.stats["messages_with_buttons"]))-26) + '║')
-        logger.info(f'║ Сообщений без кнопок: {self.stats["messages_without_buttons"]}' + ' '*(68-len(str(self.stats["messages_without_buttons"]))-26) + '║')
-
-        if self.stats['edit_delays']:
-            avg_delay = sum(self.stats['edit_delays']) / len(self.stats['edit_delays'])
-            min_delay = min(self.stats['edit_delays'])
-            max_delay = max(self.stats['edit_delays'])
-
-            logger.info('╠' + '─'*68 + '╣')
-            logger.info(f'║ ⏱️  ЗАДЕРЖКИ РЕДАКТИРОВАНИЯ:' + ' '*38 + '║')
-            logger.info(f'║   • Средняя: {avg_delay:.1f} мс' + ' '*(68-len(f"{avg_delay:.1f}")-19) + '║')
-            logger.info(f'║   • Минимум: {min_delay:.1f} мс' + ' '*(68-len(f"{min_delay:.1f}")-19) + '║')
-            logger.info(f'║   • Максимум: {max_delay:.1f} мс' + ' '*(68-len(f"{max_delay:.1f}")-19) + '║')
-            logger.info(f'║   • Замеров: {len(self.stats["edit_delays"])}' + ' '*(68-len(str(len(self.stats["edit_delays"])))-16) + '║')
+        total = self.stats['new_messages'] + self.stats['edits']
+        with_buttons = self.stats['messages_with_buttons']
+        row = self._row
+
+        lines = [
+            BANNER_TOP,
+            f'║{"📊 СТАТИСТИКА":^{BANNER_WIDTH}}║',
+            BANNER_HEAVY_SEP,
+            row('Время работы: ', str(runtime).split('.')[0]),
+            BANNER_SEP,
+            row('Всего событий: ', total),
+            row('  • Новые сообщения: ', self.stats['new_messages']),
+            row('  • Редактирования: ', self.stats['edits']),
+            row('Триггеров: ', self.stats['triggers_detected']),
+            BANNER_SEP,
+            row('Сообщений с кнопками: ', with_buttons),
+            row('Сообщений без кнопок: ', total - with_buttons),
+        ]
+
+        delay_count = self.stats['edit_delay_count']
+        if delay_count:
+            avg_delay = self.stats['edit_delay_sum'] / delay_count
+            lines += [
+                BANNER_SEP,
+                row('⏱️  ЗАДЕРЖКИ РЕДАКТИРОВАНИЯ:'),
+                row('  • Средняя: ', f'{avg_delay:.1f} мс'),
+                row('  • Минимум: ', f'{self.stats["edit_delay_min"]:.1f} мс'),
+                row('  • Максимум: ', f'{self.stats["edit_delay_max"]:.1f} мс'),
+                row('  • Замеров: ', delay_count),
+            ]
 
         if self.stats['button_texts_seen']:
-            logger.info('╠' + '─'*68 + '╣')
-            logger.info(f'║ 🎛️  УНИКАЛЬНЫХ КНОПОК: {len(self.stats["button_texts_seen"])}' + ' '*(68-len(str(len(self.stats["button_texts_seen"])))-25) + '║')
-
-        logger.info('╚' + '═'*68 + '╝')
-        logger.info('')
+            lines += [
+                BANNER_SEP,
+                row('🎛️  УНИКАЛЬНЫХ КНОПОК: ', len(self.stats['button_texts_seen'])),
+            ]
 
+        lines.append(BANNER_BOTTOM)
+        logger.info('\n%s\n', '\n'.join(lines))
 
 async def main():
     """Главная функция"""
+    log_listener.start()
     monitor = DeepMonitor()
 
     try:
@@ -337,6 +445,9 @@ async def main():
         logger.info('👋 Мониторинг завершен')
     except Exception as e:
         logger.error(f'❌ Критическая ошибка: {e}', exc_info=True)
+    finally:
+        monitor.close_event_store()
+        log_listener.stop()
 
 
 if __name__ == '__main__':
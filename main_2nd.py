@@ -7,6 +7,8 @@ Modified to click the SECOND button in Step 2
 
 import asyncio
 import logging
+import logging.handlers
+import queue
 import sys
 import signal
 from pathlib import Path
@@ -22,14 +24,18 @@ from config import Config
 from bot_automation_2nd import BotAutomation2nd
 
 
-# Configure logging
+# Configure logging: records are formatted by the QueueHandler and written
+# to stdout/file by the listener thread, off the event loop
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(
+    log_queue,
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler('bot_automation_2nd.log', encoding='utf-8')
+)
 logging.basicConfig(
     level=getattr(logging, Config.LOG_LEVEL),
     format=Config.LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot_automation_2nd.log', encoding='utf-8')
-    ]
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
 
 logger = logging.getLogger(__name__)
@@ -42,6 +48,7 @@ class AutomationApp2nd:
         self.client: TelegramClient = None
         self.automation: BotAutomation2nd = None
         self.is_running = False
+        self._shutdown = asyncio.Event()
 
     async def start(self):
         """Start the application."""
@@ -90,8 +97,9 @@ class AutomationApp2nd:
             self.is_running = True
 
             # Set up signal handlers
-            signal.signal(signal.SIGINT, lambda s, f: asyncio.create_task(self.stop()))
-            signal.signal(signal.SIGTERM, lambda s, f: asyncio.create_task(self.stop()))
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self._shutdown.set)
 
             # Show status every 60 seconds
             asyncio.create_task(self._periodic_status())
@@ -99,9 +107,9 @@ class AutomationApp2nd:
             print("\n✓ Automation is running")
             print("Press Ctrl+C to stop\n")
 
-            # Keep running
-            while self.is_running:
-                await asyncio.sleep(1)
+            # Keep running until a signal or stop() requests shutdown
+            await self._shutdown.wait()
+            await self.stop()
 
         except SessionPasswordNeededError:
             logger.error("2FA is enabled. Please disable it or implement 2FA handling")
@@ -120,6 +128,7 @@ class AutomationApp2nd:
 
         logger.info("\nStopping automation...")
         self.is_running = False
+        self._shutdown.set()
 
         if self.automation:
             await self.automation.stop()
@@ -153,8 +162,12 @@ class AutomationApp2nd:
 
 async def main():
     """Main entry point."""
-    app = AutomationApp2nd()
-    await app.start()
+    log_listener.start()
+    try:
+        app = AutomationApp2nd()
+        await app.start()
+    finally:
+        log_listener.stop()
 
 
 if __name__ == '__main__':
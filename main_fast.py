@@ -6,6 +6,7 @@ Telethon + Optimized Modules for maximum performance
 
 import asyncio
 import logging
+import signal
 import sys
 from pathlib import Path
 
@@ -27,6 +28,13 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Telethon picks up cryptg automatically for MTProto AES; without it the
+# crypto runs in pure Python on the event loop thread
+try:
+    import cryptg  # noqa: F401
+except ImportError:
+    logger.warning("cryptg not installed - MTProto crypto will be 5-10x slower")
+
 
 class AutomationApp:
     """Main application class for FAST automation."""
@@ -35,6 +43,7 @@ class AutomationApp:
         self.client: TelegramClient = None
         self.automation: BotAutomationFast = None
         self.is_running = False
+        self._shutdown = asyncio.Event()
 
     async def start(self):
         """Start the application."""
@@ -83,9 +92,9 @@ class AutomationApp:
             self.is_running = True
 
             # Set up signal handlers
-            import signal
-            signal.signal(signal.SIGINT, lambda s, f: asyncio.create_task(self.stop()))
-            signal.signal(signal.SIGTERM, lambda s, f: asyncio.create_task(self.stop()))
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self._shutdown.set)
 
             # Show status every 60 seconds
             asyncio.create_task(self._periodic_status())
@@ -93,9 +102,9 @@ class AutomationApp:
             print("\n✓ FAST Automation is running")
             print("Press Ctrl+C to stop\n")
 
-            # Keep running
-            while self.is_running:
-                await asyncio.sleep(1)
+            # Keep running until a signal or stop() requests shutdown
+            await self._shutdown.wait()
+            await self.stop()
 
         except SessionPasswordNeededError:
             logger.error("2FA is enabled. Please disable it or implement 2FA handling")
@@ -114,6 +123,7 @@ class AutomationApp:
 
         logger.info("\nStopping automation...")
         self.is_running = False
+        self._shutdown.set()
 
         if self.automation:
             await self.automation.stop()
@@ -132,19 +142,22 @@ class AutomationApp:
     async def _periodic_status(self):
         """Periodically print status."""
         while self.is_running:
-            await asyncio.sleep(60)
+            try:
+                await asyncio.wait_for(self._shutdown.wait(), timeout=60)
+                break
+            except asyncio.TimeoutError:
+                pass
             if self.is_running and self.automation:
                 logger.info("--- Status Update ---")
-                status = self.automation.get_status()
-                logger.info(f"State: {status['state_machine']['current_state']}")
-                logger.info(f"Messages: {status['message_monitor']['total_messages']}, "
-                          f"Edits: {status['message_monitor']['total_edits']}, "
-                          f"Triggers: {status['message_monitor']['triggers_detected']}")
-                logger.info(f"Clicks: {status['click_executor']['total_clicks']} "
-                          f"(Success: {status['click_executor']['successful_clicks']}, "
-                          f"Failed: {status['click_executor']['failed_clicks']})")
-                if status['metrics']['avg_cycle_time'] > 0:
-                    logger.info(f"Avg cycle time: {status['metrics']['avg_cycle_time']*1000:.1f}ms")
+                # Plain attribute reads - cheap enough to stay on the loop
+                s = self.automation.get_status_snapshot()
+                logger.info("State: %s", s.state)
+                logger.info("Messages: %d, Edits: %d, Triggers: %d",
+                            s.total_messages, s.total_edits, s.triggers)
+                logger.info("Clicks: %d (Success: %d, Failed: %d)",
+                            s.clicks, s.successful, s.failed)
+                if s.avg_cycle_ms > 0:
+                    logger.info("Avg cycle time: %.1fms", s.avg_cycle_ms)
 
 
 async def main():
@@ -154,6 +167,13 @@ async def main():
 
 
 if __name__ == '__main__':
+    # uvloop must be installed before the loop (and the client) is created
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        logger.info("uvloop not installed - using the default asyncio event loop")
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
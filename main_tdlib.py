@@ -6,8 +6,10 @@ High-performance version using pytdbot and optimized modules
 
 import asyncio
 import logging
+import signal
 import sys
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 from pytdbot import Client, types
 
@@ -26,6 +28,26 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# One TDLib client per account: each carries its own database, keys and
+# update stream, so automations of the same account share it
+_clients: Dict[str, Client] = {}
+
+
+def get_or_create_client(phone: str) -> Client:
+    """Get the TDLib client of an account, creating it on first use."""
+    client = _clients.get(phone)
+    if client is None:
+        # pytdbot doesn't use phone in constructor, it handles auth automatically
+        client = _clients[phone] = Client(
+            api_id=int(Config.API_ID),
+            api_hash=Config.API_HASH,
+            database_encryption_key='automation_key_2024',
+            files_directory='./tdlib_files/',
+            td_verbosity=1,  # Minimal TDLib logging
+            td_log=types.LogStreamFile('tdlib.log', 10485760)  # 10MB log file
+        )
+    return client
+
 
 class AutomationApp:
     """Main TDLib automation application."""
@@ -33,7 +55,13 @@ class AutomationApp:
     def __init__(self):
         self.client: Client = None
         self.automation: BotAutomationTDLib = None
+        # Automations sharing the client, keyed by bot chat ID
+        self.automations: Dict[int, BotAutomationTDLib] = {}
+        # (chat_id, message_id) -> getMessage in flight; True once a newer edit
+        # arrived while it was running and the fetch has to be repeated
+        self._edit_fetches: Dict[Tuple[int, int], bool] = {}
         self.is_running = False
+        self._shutdown = asyncio.Event()
 
     async def start(self):
         """Start the application."""
@@ -51,32 +79,26 @@ class AutomationApp:
             # Initialize TDLib client
             logger.info("Initializing TDLib client...")
 
-            # pytdbot doesn't use phone in constructor, it handles auth automatically
-            self.client = Client(
-                api_id=int(Config.API_ID),
-                api_hash=Config.API_HASH,
-                database_encryption_key='automation_key_2024',
-                files_directory='./tdlib_files/',
-                td_verbosity=1,  # Minimal TDLib logging
-                td_log=types.LogStreamFile('tdlib.log', 10485760)  # 10MB log file
-            )
+            self.client = get_or_create_client(Config.PHONE)
 
-            # Register message handlers
+            # Register message handlers, routing updates by chat to the automation
             @self.client.on_updateNewMessage()
             async def handle_new_message(c: Client, update: types.UpdateNewMessage):
-                if self.automation:
-                    await self.automation.handle_new_message(update.message)
+                automation = self.automations.get(update.message.chat_id)
+                if automation:
+                    await automation.handle_new_message(update.message)
 
             @self.client.on_updateMessageContent()
             async def handle_message_edit(c: Client, update: types.UpdateMessageContent):
+                automation = self.automations.get(update.chat_id)
+                if not automation:
+                    return  # Not a target bot chat - skip the getMessage round-trip
+
                 # Get full message
                 try:
-                    message = await c.getMessage(
-                        chat_id=update.chat_id,
-                        message_id=update.message_id
-                    )
-                    if self.automation:
-                        await self.automation.handle_message_edit(message)
+                    message = await self._fetch_edited_message(c, update.chat_id, update.message_id)
+                    if message is not None:
+                        await automation.handle_message_edit(message)
                 except Exception as e:
                     logger.debug(f"Error getting edited message: {e}")
 
@@ -103,18 +125,24 @@ class AutomationApp:
             )
 
             await self.automation.start()
+            self.automations[self.automation.bot_chat_id] = self.automation
 
             self.is_running = True
 
+            # Set up signal handlers
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self._shutdown.set)
+
             # Show status periodically
             asyncio.create_task(self._periodic_status())
 
             print("\n✓ TDLib Automation is running")
             print("Press Ctrl+C to stop\n")
 
-            # Keep running
-            while self.is_running:
-                await asyncio.sleep(1)
+            # Keep running until a signal or stop() requests shutdown
+            await self._shutdown.wait()
+            await self.stop()
 
         except KeyboardInterrupt:
             await self.stop()
@@ -123,6 +151,30 @@ class AutomationApp:
             await self.stop()
             sys.exit(1)
 
+    async def _fetch_edited_message(self, c: Client, chat_id: int, message_id: int) -> Optional[types.Message]:
+        """
+        Fetch an edited message, coalescing edit storms on the same message.
+
+        While a getMessage for the message is in flight, further edits only
+        mark it stale and return None; the running fetch then repeats once
+        so the latest content is handled exactly once.
+        """
+        key = (chat_id, message_id)
+        if key in self._edit_fetches:
+            self._edit_fetches[key] = True
+            return None
+
+        self._edit_fetches[key] = False
+        try:
+            while True:
+                message = await c.getMessage(chat_id=chat_id, message_id=message_id)
+                if not self._edit_fetches[key]:
+                    return message
+                # A newer edit landed mid-fetch - this result may predate it
+                self._edit_fetches[key] = False
+        finally:
+            del self._edit_fetches[key]
+
     async def stop(self):
         """Stop the application."""
         if not self.is_running:
@@ -130,6 +182,7 @@ class AutomationApp:
 
         logger.info("\nStopping automation...")
         self.is_running = False
+        self._shutdown.set()
 
         if self.automation:
             await self.automation.stop()
@@ -154,17 +207,22 @@ class AutomationApp:
     async def _periodic_status(self):
         """Periodically print status."""
         while self.is_running:
-            await asyncio.sleep(60)
+            try:
+                await asyncio.wait_for(self._shutdown.wait(), timeout=60)
+                break
+            except asyncio.TimeoutError:
+                pass
             if self.is_running and self.automation:
                 logger.info("--- Status Update ---")
-                stats = self.automation.get_statistics()
-                logger.info(f"State: {stats['state']}")
-                logger.info(f"Total cycles: {stats['metrics']['total_cycles']}, "
-                          f"Success: {stats['metrics']['successful_cycles']}, "
-                          f"Failed: {stats['metrics']['failed_cycles']}")
-                logger.info(f"Total clicks: {stats['metrics']['total_clicks']}")
-                if stats['metrics']['avg_cycle_time'] > 0:
-                    logger.info(f"Avg cycle time: {stats['metrics']['avg_cycle_time']*1000:.1f}ms")
+                # Aggregation walks the detector/cache dicts; keep it off the loop
+                stats = await asyncio.to_thread(self.automation.get_statistics)
+                metrics = stats['metrics']
+                logger.info("State: %s", stats['state'])
+                logger.info("Total cycles: %d, Success: %d, Failed: %d",
+                            metrics['total_cycles'], metrics['successful_cycles'], metrics['failed_cycles'])
+                logger.info("Total clicks: %d", metrics['total_clicks'])
+                if metrics['avg_cycle_time'] > 0:
+                    logger.info("Avg cycle time: %.1fms", metrics['avg_cycle_time'] * 1000)
 
 
 async def main():
@@ -174,6 +232,13 @@ async def main():
 
 
 if __name__ == '__main__':
+    # uvloop must be installed before the loop (and the client) is created
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        logger.info("uvloop not installed - using the default asyncio event loop")
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
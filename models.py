@@ -2,7 +2,7 @@
 SQLAlchemy models for the control panel database.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -32,6 +32,8 @@ class Session(Base):
 class TargetBot(Base):
     """Configuration for target bots to automate"""
     __tablename__ = 'target_bots'
+    # Serves both per-session listings and the (session, username) existence check
+    __table_args__ = (Index('ix_target_bots_session_username', 'session_id', 'bot_username'),)
 
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey('sessions.id'), nullable=False)
@@ -93,6 +95,8 @@ class Statistics(Base):
 class AuthorizedUser(Base):
     """Authorized users for the control bot"""
     __tablename__ = 'authorized_users'
+    # Covers the is_user_authorized lookup without touching the table
+    __table_args__ = (Index('ix_user_active', 'telegram_id', 'is_active'),)
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(Integer, unique=True, nullable=False)
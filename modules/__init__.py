@@ -2,7 +2,7 @@
 Modules package for Telegram bot automation system.
 """
 
-from .button_cache import ButtonCache, ButtonInfo, MessageData
+from .button_cache import ButtonCache, ButtonInfo, ButtonLayout, MessageData
 from .message_monitor import MessageMonitor
 from .button_analyzer import ButtonAnalyzer
 from .stabilization_detector import StabilizationDetector
@@ -12,6 +12,7 @@ from .state_machine import StateMachine, AutomationState
 __all__ = [
     'ButtonCache',
     'ButtonInfo',
+    'ButtonLayout',
     'MessageData',
     'MessageMonitor',
     'ButtonAnalyzer',
@@ -4,14 +4,20 @@ Analyzes and extracts inline buttons from messages.
 """
 
 import logging
-from typing import List, Optional
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Pattern
 from telethon.tl.types import Message, ReplyInlineMarkup, KeyboardButtonCallback
 
-from .button_cache import ButtonInfo
+from .button_cache import ButtonInfo, ButtonLayout, intern_text
 
 
 logger = logging.getLogger(__name__)
 
+# Returned for every message without an inline keyboard (layouts are immutable)
+_EMPTY = ButtonLayout()
+
 
 class ButtonAnalyzer:
     """
@@ -19,7 +25,7 @@ class ButtonAnalyzer:
     Implements FR-2.x requirements.
     """
 
-    def extract_buttons(self, message: Message) -> List[ButtonInfo]:
+    def extract_buttons(self, message: Message) -> ButtonLayout:
         """
         Extract all inline buttons from a message (FR-2.1).
 
@@ -27,37 +33,25 @@ class ButtonAnalyzer:
             message: Telegram message
 
         Returns:
-            List of ButtonInfo objects
-        """
-        buttons = []
-
-        # Check if message has inline keyboard
-        if not hasattr(message, 'reply_markup') or not message.reply_markup:
-            return buttons
-
-        reply_markup = message.reply_markup
-
-        # Only process inline keyboards
-        if not isinstance(reply_markup, ReplyInlineMarkup):
-            return buttons
-
-        # Extract buttons from each row
-        for row_idx, row in enumerate(reply_markup.rows):
-            for col_idx, button in enumerate(row.buttons):
-                # Extract button data
-                button_text = getattr(button, 'text', '')
-                callback_data = getattr(button, 'data', b'')
-
-                if button_text:
-                    button_info = ButtonInfo(
-                        text=button_text,
-                        callback_data=callback_data,
-                        row=row_idx,
-                        column=col_idx
-                    )
-                    buttons.append(button_info)
-
-        return buttons
+            ButtonLayout (sequence of ButtonInfo objects with position index).
+            Buttons are in row-major order, which compare_button_structures
+            relies on.
+        """
+        # Most updates carry no inline keyboard: one lookup, shared empty result
+        reply_markup = getattr(message, 'reply_markup', None)
+        if type(reply_markup) is not ReplyInlineMarkup:
+            return _EMPTY
+
+        # Single flat pass over all rows; one clock read stamps the whole keyboard
+        now = datetime.now()
+        buttons = [
+            ButtonInfo(intern_text(text), getattr(button, 'data', b''), row_idx, col_idx, now, now)
+            for row_idx, row in enumerate(reply_markup.rows)
+            for col_idx, button in enumerate(row.buttons)
+            if (text := getattr(button, 'text', ''))
+        ]
+
+        return ButtonLayout(buttons)
 
     def get_first_button(self, buttons: List[ButtonInfo]) -> Optional[ButtonInfo]:
         """
@@ -72,6 +66,9 @@ class ButtonAnalyzer:
         if not buttons:
             return None
 
+        if isinstance(buttons, ButtonLayout):
+            return buttons.first
+
         # Find button at position [0,0]
         for button in buttons:
             if button.row == 0 and button.column == 0:
@@ -96,13 +93,11 @@ class ButtonAnalyzer:
         search_text_lower = search_text.lower()
 
         for button in buttons:
-            button_text_lower = button.text.lower()
-
             if exact:
-                if button_text_lower == search_text_lower:
+                if button.text_lower == search_text_lower:
                     return button
             else:
-                if search_text_lower in button_text_lower:
+                if search_text_lower in button.text_lower:
                     return button
 
         return None
@@ -122,16 +117,25 @@ class ButtonAnalyzer:
         if not keywords:
             return None
 
-        for button in buttons:
-            button_text_lower = button.text.lower()
+        # One pass over each button text instead of a loop over keywords
+        pattern = self._compile_keywords(frozenset(keyword.lower() for keyword in keywords))
 
-            for keyword in keywords:
-                if keyword.lower() in button_text_lower:
-                    logger.debug(f"Button '{button.text}' matched keyword '{keyword}'")
-                    return button
+        for button in buttons:
+            match = pattern.search(button.text_lower)
+            if match:
+                logger.debug("Button %r matched keyword %r", button.text, match.group())
+                return button
 
         return None
 
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _compile_keywords(keywords_lower: FrozenSet[str]) -> Pattern:
+        """Cached alternation regex over lowercased keywords."""
+        # Longest first so the reported match is the most specific keyword
+        ordered = sorted(keywords_lower, key=len, reverse=True)
+        return re.compile('|'.join(map(re.escape, ordered)))
+
     def find_confirmation_button(self, buttons: List[ButtonInfo],
                                 keywords: List[str]) -> Optional[ButtonInfo]:
         """
@@ -159,6 +163,9 @@ class ButtonAnalyzer:
         Returns:
             Button at position or None
         """
+        if isinstance(buttons, ButtonLayout):
+            return buttons.by_pos.get((row, column))
+
         for button in buttons:
             if button.row == row and button.column == column:
                 return button
@@ -180,11 +187,13 @@ class ButtonAnalyzer:
         if len(buttons1) != len(buttons2):
             return False
 
-        # Sort buttons by position for comparison
-        sorted1 = sorted(buttons1, key=lambda b: (b.row, b.column))
-        sorted2 = sorted(buttons2, key=lambda b: (b.row, b.column))
+        # Different structure hashes settle the common "changed" case at once
+        if (isinstance(buttons1, ButtonLayout) and isinstance(buttons2, ButtonLayout)
+                and buttons1.structure_hash != buttons2.structure_hash):
+            return False
 
-        for b1, b2 in zip(sorted1, sorted2):
+        # extract_buttons emits buttons in row-major order, so no sorting is needed
+        for b1, b2 in zip(buttons1, buttons2):
             if (b1.text != b2.text or
                 b1.row != b2.row or
                 b1.column != b2.column):
@@ -233,9 +242,13 @@ class ButtonAnalyzer:
             buttons: List of ButtonInfo objects
             prefix: Optional prefix for log message
         """
+        # Production runs at INFO; skip building the layout string entirely
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
         if not buttons:
-            logger.debug(f"{prefix}No buttons found")
+            logger.debug("%sNo buttons found", prefix)
             return
 
         layout = self.get_button_layout(buttons)
-        logger.debug(f"{prefix}Buttons layout:\n{layout}")
+        logger.debug("%sButtons layout:\n%s", prefix, layout)
@@ -4,36 +4,80 @@ Caches recent messages with inline keyboards for fast access.
 """
 
 import logging
+import sys
 from datetime import datetime
-from typing import Dict, List, Optional
+from time import monotonic
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass, field
 
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@lru_cache(maxsize=2048)
+def intern_text(text: str) -> str:
+    """
+    Intern a button text.
+
+    Bots reuse a small button vocabulary, so interned texts compare by
+    identity; the bounded cache keeps the intern table from growing without
+    limit on unusual input.
+    """
+    return sys.intern(text)
+
+
+@dataclass(slots=True)
 class ButtonInfo:
     """Information about a single inline button."""
     text: str
     callback_data: bytes
     row: int
     column: int
-    first_seen: datetime = field(default_factory=datetime.now)
-    last_seen: datetime = field(default_factory=datetime.now)
+    # Timestamps are bookkeeping only; equality is by text, data and position
+    first_seen: datetime = field(default_factory=datetime.now, compare=False)
+    last_seen: datetime = field(default_factory=datetime.now, compare=False)
+    # Lowercased text, computed once for keyword/text matching
+    text_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.text_lower = self.text.lower()
 
     def __repr__(self) -> str:
         return f"Button('{self.text}' at [{self.row},{self.column}])"
 
 
-@dataclass
+class ButtonLayout(tuple):
+    """
+    Buttons of one inline keyboard in row-major order, indexed by position.
+
+    Behaves as a plain sequence of ButtonInfo, so code that iterates or
+    stores button lists keeps working; the position index makes first-button
+    and position lookups a single dict probe.
+    """
+
+    def __new__(cls, buttons: Iterable[ButtonInfo] = ()):
+        layout = super().__new__(cls, buttons)
+        layout.by_pos: Dict[Tuple[int, int], ButtonInfo] = {
+            (button.row, button.column): button for button in layout
+        }
+        layout.first: Optional[ButtonInfo] = layout.by_pos.get((0, 0)) or (layout[0] if layout else None)
+        # Differs whenever text or position of any button differs (barring collisions)
+        layout.structure_hash: int = hash(tuple(
+            (button.row, button.column, button.text) for button in layout
+        ))
+        return layout
+
+
+@dataclass(slots=True)
 class MessageData:
     """Cached message data with inline keyboard."""
     message_id: int
     chat_id: int
     text: str
     buttons: List[ButtonInfo]
-    last_edit_time: datetime
+    last_edit_time: float  # time.monotonic() of the last update
     edit_count: int = 0
 
     def __repr__(self) -> str:
@@ -54,6 +98,8 @@ class ButtonCache:
             max_messages: Maximum number of messages to cache
         """
         self.max_messages = max_messages
+        # Insertion-ordered by last update: oldest first, most recently edited
+        # last (updates re-insert their entry at the end)
         self.messages_cache: Dict[int, MessageData] = {}
         self.buttons_history: List[Dict] = []
 
@@ -68,18 +114,20 @@ class ButtonCache:
             text: Message text
             buttons: List of buttons in the message
         """
-        now = datetime.now()
+        now = monotonic()
 
         if message_id in self.messages_cache:
             # Update existing message
             msg_data = self.messages_cache[message_id]
+
+            # Log changes (while the old buttons are still in place)
+            self._log_button_changes(message_id, msg_data.buttons, buttons)
+
             msg_data.text = text
             msg_data.buttons = buttons
             msg_data.last_edit_time = now
             msg_data.edit_count += 1
-
-            # Log changes
-            self._log_button_changes(message_id, buttons)
+            self.messages_cache[message_id] = self.messages_cache.pop(message_id)
         else:
             # Add new message
             msg_data = MessageData(
@@ -92,11 +140,13 @@ class ButtonCache:
             )
             self.messages_cache[message_id] = msg_data
 
-            # Clean up old messages if cache is full
-            if len(self.messages_cache) > self.max_messages:
-                self._cleanup_old_messages()
+            # Evict the least recently updated messages if cache is full
+            while len(self.messages_cache) > self.max_messages:
+                old_id = next(iter(self.messages_cache))
+                del self.messages_cache[old_id]
+                logger.debug("Removed old message %s from cache", old_id)
 
-        logger.debug(f"Updated cache: {msg_data}")
+        logger.debug("Updated cache: %s", msg_data)
 
     def get_message(self, message_id: int) -> Optional[MessageData]:
         """
@@ -120,10 +170,20 @@ class ButtonCache:
         if not self.messages_cache:
             return None
 
-        return max(
-            self.messages_cache.values(),
-            key=lambda m: m.last_edit_time
-        )
+        return next(reversed(self.messages_cache.values()))
+
+    def get_latest_messages(self, k: int = 1) -> List[MessageData]:
+        """
+        Get the k most recently updated messages.
+
+        Args:
+            k: Number of messages to return
+
+        Returns:
+            Up to k MessageData objects, most recent first
+        """
+        # The cache is kept in update order, so this reads k entries off the end
+        return list(islice(reversed(self.messages_cache.values()), k))
 
     def find_button(self, criteria: str, message_id: Optional[int] = None) -> Optional[ButtonInfo]:
         """
@@ -141,15 +201,11 @@ class ButtonCache:
         Returns:
             First matching ButtonInfo or None
         """
-        messages = [self.messages_cache[message_id]] if message_id and message_id in self.messages_cache \
+        messages = (self.messages_cache[message_id],) if message_id in self.messages_cache \
                    else self.messages_cache.values()
 
-        for message in messages:
-            for button in message.buttons:
-                if self._matches_criteria(button, criteria):
-                    return button
-
-        return None
+        matcher = self._compile_criteria(criteria)
+        return next((button for message in messages for button in message.buttons if matcher(button)), None)
 
     def find_all_buttons(self, criteria: str, message_id: Optional[int] = None) -> List[ButtonInfo]:
         """
@@ -162,16 +218,11 @@ class ButtonCache:
         Returns:
             List of matching ButtonInfo objects
         """
-        messages = [self.messages_cache[message_id]] if message_id and message_id in self.messages_cache \
+        messages = (self.messages_cache[message_id],) if message_id in self.messages_cache \
                    else self.messages_cache.values()
 
-        results = []
-        for message in messages:
-            for button in message.buttons:
-                if self._matches_criteria(button, criteria):
-                    results.append(button)
-
-        return results
+        matcher = self._compile_criteria(criteria)
+        return [button for message in messages for button in message.buttons if matcher(button)]
 
     def get_edit_frequency(self, message_id: int, time_window: float = 1.0) -> float:
         """
@@ -198,60 +249,49 @@ class ButtonCache:
         self.buttons_history.clear()
         logger.info("Cache cleared")
 
-    def _matches_criteria(self, button: ButtonInfo, criteria: str) -> bool:
-        """Check if button matches search criteria."""
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _compile_criteria(criteria: str) -> Callable[[ButtonInfo], bool]:
+        """Parse search criteria once into a per-button predicate."""
         if criteria == "first":
-            return button.row == 0 and button.column == 0
+            return lambda button: button.row == 0 and button.column == 0
 
         if criteria.startswith("text:"):
             search_text = criteria[5:].lower()
-            return button.text.lower() == search_text
+            return lambda button: button.text_lower == search_text
 
         if criteria.startswith("contains:"):
             search_text = criteria[9:].lower()
-            return search_text in button.text.lower()
+            return lambda button: search_text in button.text_lower
 
         if criteria.startswith("position:"):
             try:
                 pos = criteria[9:].split(',')
                 row, col = int(pos[0]), int(pos[1])
-                return button.row == row and button.column == col
             except (ValueError, IndexError):
-                return False
+                return lambda button: False
+            return lambda button: button.row == row and button.column == col
 
         if criteria.startswith("keywords:"):
-            keywords = criteria[9:].split(',')
-            button_text_lower = button.text.lower()
-            return any(kw.strip().lower() in button_text_lower for kw in keywords)
+            keywords = tuple(kw.strip().lower() for kw in criteria[9:].split(','))
+            return lambda button: any(kw in button.text_lower for kw in keywords)
 
-        return False
+        return lambda button: False
 
-    def _log_button_changes(self, message_id: int, new_buttons: List[ButtonInfo]) -> None:
+    def _log_button_changes(self, message_id: int, old_buttons: List[ButtonInfo],
+                            new_buttons: List[ButtonInfo]) -> None:
         """Log changes in button structure."""
-        old_data = self.messages_cache.get(message_id)
-        if not old_data:
+        # Only ever logged at DEBUG; don't build the text lists otherwise
+        if not logger.isEnabledFor(logging.DEBUG):
             return
 
-        old_texts = [b.text for b in old_data.buttons]
-        new_texts = [b.text for b in new_buttons]
-
-        if old_texts != new_texts:
-            logger.debug(f"Buttons changed in message {message_id}: {old_texts} -> {new_texts}")
-
-    def _cleanup_old_messages(self) -> None:
-        """Remove oldest messages from cache."""
-        if len(self.messages_cache) <= self.max_messages:
+        # Most edits re-send the same keyboard: layouts compare by hash alone
+        old_hash = getattr(old_buttons, 'structure_hash', None)
+        if old_hash is not None and old_hash == getattr(new_buttons, 'structure_hash', None):
             return
 
-        # Sort by last edit time and remove oldest
-        sorted_messages = sorted(
-            self.messages_cache.items(),
-            key=lambda x: x[1].last_edit_time
-        )
-
-        # Keep only the most recent max_messages
-        messages_to_remove = sorted_messages[:len(sorted_messages) - self.max_messages]
+        old_texts = [b.text for b in old_buttons]
+        new_texts = [b.text for b in new_buttons]
 
-        for msg_id, _ in messages_to_remove:
-            del self.messages_cache[msg_id]
-            logger.debug(f"Removed old message {msg_id} from cache")
+        if old_texts != new_texts:
+            logger.debug("Buttons changed in message %s: %s -> %s", message_id, old_texts, new_texts)
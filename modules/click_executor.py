@@ -5,8 +5,9 @@ Executes button clicks with error handling and retry logic.
 
 import logging
 import asyncio
-from typing import Optional, Any
-from datetime import datetime
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from time import monotonic
 from telethon import TelegramClient
 from telethon.tl.functions.messages import GetBotCallbackAnswerRequest
 from telethon.errors import (
@@ -23,6 +24,43 @@ from .button_cache import ButtonInfo
 logger = logging.getLogger(__name__)
 
 
+# Retry delays grow by this factor per attempt
+BACKOFF_FACTOR = 1.5
+# Random extra delay per retry, as a fraction of retry_delay
+RETRY_JITTER = 0.1
+
+
+class RetryPolicy(NamedTuple):
+    """How click_button handles a retryable error."""
+    delay_factor: float  # First retry waits retry_delay * delay_factor
+    warning: str  # Logged on every failed attempt
+    failure: str  # ClickResult message once retries are exhausted
+
+
+# Retryable errors (FR-4.2, FR-4.3, FR-4.5); anything else not handled
+# explicitly is retried as an unexpected error
+_RETRY_POLICIES: Dict[type, RetryPolicy] = {
+    MessageNotModifiedError: RetryPolicy(
+        1.0, "Message {message_id} was modified during click", "Message was modified, max retries reached"
+    ),
+    QueryIdInvalidError: RetryPolicy(
+        2.0, "Callback query invalid for message {message_id}", "Query ID invalid, button may have changed"
+    ),
+    TelethonTimeoutError: RetryPolicy(
+        1.0, "Timeout clicking button", "Timeout after max retries"
+    ),
+}
+
+
+def _retry_policy(error: Exception) -> Optional[RetryPolicy]:
+    """Policy for an error, matched on its class hierarchy."""
+    for cls in type(error).__mro__:
+        policy = _RETRY_POLICIES.get(cls)
+        if policy is not None:
+            return policy
+    return None
+
+
 class ClickResult:
     """Result of a button click operation."""
 
@@ -61,6 +99,13 @@ class ClickExecutor:
         self.max_retries = max_retries
         self.retry_delay = retry_delay
 
+        # Per-attempt backoff schedule for each retry policy (None: unexpected errors)
+        self._backoff: Dict[Optional[RetryPolicy], List[float]] = {
+            policy: self._backoff_schedule(policy.delay_factor) for policy in _RETRY_POLICIES.values()
+        }
+        self._backoff[None] = self._backoff_schedule(1.0)
+        self._jitter = retry_delay * RETRY_JITTER
+
         # Statistics
         self.total_clicks = 0
         self.successful_clicks = 0
@@ -79,14 +124,14 @@ class ClickExecutor:
         Returns:
             ClickResult with operation status
         """
-        start_time = datetime.now()
+        start_time = monotonic()
         self.total_clicks += 1
 
         for attempt in range(self.max_retries):
             try:
                 logger.debug(
-                    f"Clicking button '{button_text}' (msg: {message_id}, "
-                    f"attempt {attempt + 1}/{self.max_retries})"
+                    "Clicking button '%s' (msg: %s, attempt %d/%d)",
+                    button_text, message_id, attempt + 1, self.max_retries
                 )
 
                 # Execute callback query (FR-4.1)
@@ -96,7 +141,7 @@ class ClickExecutor:
                     data=callback_data
                 ))
 
-                execution_time = (datetime.now() - start_time).total_seconds()
+                execution_time = monotonic() - start_time
 
                 logger.info(
                     f"✓ Button '{button_text}' clicked successfully "
@@ -111,46 +156,6 @@ class ClickExecutor:
                     execution_time=execution_time
                 )
 
-            except MessageNotModifiedError:
-                # Message was edited, need to get updated callback_data (FR-4.2)
-                logger.warning(
-                    f"Message {message_id} was modified during click, "
-                    f"attempt {attempt + 1}/{self.max_retries}"
-                )
-
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
-                    continue
-                else:
-                    execution_time = (datetime.now() - start_time).total_seconds()
-                    self.failed_clicks += 1
-                    return ClickResult(
-                        success=False,
-                        message="Message was modified, max retries reached",
-                        error=MessageNotModifiedError("Message modified"),
-                        execution_time=execution_time
-                    )
-
-            except QueryIdInvalidError:
-                # Callback query is invalid/outdated (FR-4.3)
-                logger.warning(
-                    f"Callback query invalid for message {message_id}, "
-                    f"attempt {attempt + 1}/{self.max_retries}"
-                )
-
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay * 2)
-                    continue
-                else:
-                    execution_time = (datetime.now() - start_time).total_seconds()
-                    self.failed_clicks += 1
-                    return ClickResult(
-                        success=False,
-                        message="Query ID invalid, button may have changed",
-                        error=QueryIdInvalidError("Invalid query"),
-                        execution_time=execution_time
-                    )
-
             except FloodWaitError as e:
                 # Hit rate limit, must wait (FR-4.4)
                 wait_time = e.seconds
@@ -158,76 +163,54 @@ class ClickExecutor:
 
                 if wait_time > 60:
                     # Wait time too long, abort
-                    execution_time = (datetime.now() - start_time).total_seconds()
-                    self.failed_clicks += 1
-                    return ClickResult(
-                        success=False,
-                        message=f"Flood wait too long: {wait_time}s",
-                        error=e,
-                        execution_time=execution_time
-                    )
+                    return self._failed(f"Flood wait too long: {wait_time}s", e, start_time)
 
                 await asyncio.sleep(wait_time)
                 continue
 
-            except TelethonTimeoutError as e:
-                # Request timeout (FR-4.5)
-                logger.warning(
-                    f"Timeout clicking button, attempt {attempt + 1}/{self.max_retries}"
-                )
-
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
-                    continue
-                else:
-                    execution_time = (datetime.now() - start_time).total_seconds()
-                    self.failed_clicks += 1
-                    return ClickResult(
-                        success=False,
-                        message="Timeout after max retries",
-                        error=e,
-                        execution_time=execution_time
-                    )
-
             except DataInvalidError as e:
                 # Session is invalid, need to restart application
                 logger.error(
                     f"DataInvalidError: Session is invalid. Application restart required. "
                     f"Error: {e}"
                 )
-                execution_time = (datetime.now() - start_time).total_seconds()
-                self.failed_clicks += 1
-                return ClickResult(
-                    success=False,
-                    message="Session invalid - restart required",
-                    error=e,
-                    execution_time=execution_time
-                )
+                return self._failed("Session invalid - restart required", e, start_time)
 
             except Exception as e:
-                # Unexpected error
-                logger.error(f"Unexpected error clicking button: {e}", exc_info=True)
+                policy = _retry_policy(e)
+                if policy is None:
+                    # Unexpected error
+                    logger.error(f"Unexpected error clicking button: {e}", exc_info=True)
+                    failure = f"Unexpected error: {str(e)}"
+                else:
+                    logger.warning(
+                        f"{policy.warning.format(message_id=message_id)}, "
+                        f"attempt {attempt + 1}/{self.max_retries}"
+                    )
+                    failure = policy.failure
 
                 if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
+                    # Jitter keeps clients that failed together from retrying in lockstep
+                    await asyncio.sleep(self._backoff[policy][attempt] + random.uniform(0, self._jitter))
                     continue
-                else:
-                    execution_time = (datetime.now() - start_time).total_seconds()
-                    self.failed_clicks += 1
-                    return ClickResult(
-                        success=False,
-                        message=f"Unexpected error: {str(e)}",
-                        error=e,
-                        execution_time=execution_time
-                    )
+                return self._failed(failure, e, start_time)
 
         # Should not reach here, but just in case
-        execution_time = (datetime.now() - start_time).total_seconds()
+        return self._failed("Max retries exceeded", None, start_time)
+
+    def _backoff_schedule(self, delay_factor: float) -> List[float]:
+        """Exponential retry delays, one per attempt."""
+        base = self.retry_delay * delay_factor
+        return [base * BACKOFF_FACTOR ** attempt for attempt in range(self.max_retries)]
+
+    def _failed(self, message: str, error: Optional[Exception], start_time: float) -> ClickResult:
+        """Count a failed click and build its result."""
         self.failed_clicks += 1
         return ClickResult(
             success=False,
-            message="Max retries exceeded",
-            execution_time=execution_time
+            message=message,
+            error=error,
+            execution_time=monotonic() - start_time
         )
 
     async def click_button_info(self, message_id: int,
@@ -263,11 +246,42 @@ class ClickExecutor:
             ClickResult
         """
         if delay > 0:
-            logger.debug(f"Waiting {delay*1000:.1f}ms before clicking '{button_text}'")
+            logger.debug("Waiting %.1fms before clicking '%s'", delay * 1000, button_text)
             await asyncio.sleep(delay)
 
         return await self.click_button(message_id, callback_data, button_text)
 
+    async def click_buttons_batch(self, items: Sequence[Tuple[int, bytes, str]],
+                                  max_concurrency: Optional[int] = None) -> List[ClickResult]:
+        """
+        Click several independent buttons concurrently.
+
+        Each click keeps the retry logic of click_button; the callback queries
+        are in flight together instead of waiting on each other's round-trip.
+
+        Args:
+            items: (message_id, callback_data, button_text) per click
+            max_concurrency: Optional cap on simultaneous clicks (FLOOD_WAIT)
+
+        Returns:
+            ClickResult per item, in the same order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def click(message_id: int, callback_data: bytes, button_text: str) -> ClickResult:
+            if semaphore is None:
+                return await self.click_button(message_id, callback_data, button_text)
+            async with semaphore:
+                return await self.click_button(message_id, callback_data, button_text)
+
+        results = await asyncio.gather(*(click(*item) for item in items), return_exceptions=True)
+
+        return [
+            result if isinstance(result, ClickResult)
+            else ClickResult(success=False, message=f"Batch click failed: {result}", error=result)
+            for result in results
+        ]
+
     def get_statistics(self) -> dict:
         """
         Get click executor statistics.
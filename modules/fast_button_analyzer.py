@@ -4,12 +4,26 @@ Pre-compiles search patterns and uses efficient string matching
 """
 
 import logging
-from typing import List, Optional, Set
+import re
+from typing import Dict, FrozenSet, List, Optional, Pattern, Sequence, Set, Tuple
 from functools import lru_cache
+from operator import attrgetter
 from telethon.tl.types import Message, ReplyInlineMarkup
 
+from .button_cache import intern_text
+
 logger = logging.getLogger(__name__)
 
+# Returned for every message without an inline keyboard; a tuple, so no
+# caller can mutate the shared instance
+_EMPTY: Tuple['ButtonInfo', ...] = ()
+
+# Structural identity of a button for compare_button_structures
+_signature = attrgetter('text', 'row', 'column')
+
+# Distinct keyword lists memoized per analyzer (callers use a handful)
+KEYWORD_CACHE_SIZE = 64
+
 
 class ButtonInfo:
     """Lightweight button information."""
@@ -34,10 +48,11 @@ class FastButtonAnalyzer:
 
     def __init__(self):
         """Initialize the analyzer."""
-        # Pre-compile keyword sets for O(1) lookups
-        self._keyword_cache: dict = {}
+        # Keyword list as passed by the caller -> compiled pattern, so repeat
+        # calls with the same configured list skip lowercasing entirely
+        self._keyword_cache: Dict[Tuple[str, ...], Pattern] = {}
 
-    def extract_buttons(self, message: Message) -> List[ButtonInfo]:
+    def extract_buttons(self, message: Message) -> Sequence[ButtonInfo]:
         """
         Extract buttons from Telethon message (optimized).
 
@@ -45,37 +60,21 @@ class FastButtonAnalyzer:
             message: Telethon Message object
 
         Returns:
-            List of ButtonInfo objects
-        """
-        buttons = []
-
-        # Check if message has inline keyboard
-        if not hasattr(message, 'reply_markup') or not message.reply_markup:
-            return buttons
-
-        reply_markup = message.reply_markup
-
-        # Only process inline keyboards
-        if not isinstance(reply_markup, ReplyInlineMarkup):
-            return buttons
-
-        # Fast extraction - iterate through rows and buttons
-        for row_idx, row in enumerate(reply_markup.rows):
-            for col_idx, button in enumerate(row.buttons):
-                # Extract button data efficiently
-                button_text = getattr(button, 'text', '')
-                callback_data = getattr(button, 'data', b'')
-
-                if button_text:
-                    button_info = ButtonInfo(
-                        text=button_text,
-                        callback_data=callback_data,
-                        row=row_idx,
-                        column=col_idx
-                    )
-                    buttons.append(button_info)
-
-        return buttons
+            List of ButtonInfo objects (shared empty tuple if none)
+        """
+        # Most updates carry no inline keyboard: one lookup, shared empty result
+        reply_markup = getattr(message, 'reply_markup', None)
+        if type(reply_markup) is not ReplyInlineMarkup:
+            return _EMPTY
+
+        # Fast extraction - one flat comprehension, positional construction.
+        # Every inline button type carries .text; only callback buttons have .data
+        return [
+            ButtonInfo(intern_text(button.text), getattr(button, 'data', b''), row_idx, col_idx)
+            for row_idx, row in enumerate(reply_markup.rows)
+            for col_idx, button in enumerate(row.buttons)
+            if button.text
+        ]
 
     def get_first_button(self, buttons: List[ButtonInfo]) -> Optional[ButtonInfo]:
         """
@@ -90,13 +89,18 @@ class FastButtonAnalyzer:
         if not buttons:
             return None
 
+        # extract_buttons emits row-major order, so [0,0] is normally first
+        first = buttons[0]
+        if first.row == 0 and first.column == 0:
+            return first
+
         # Try to find [0,0] button
         for button in buttons:
             if button.row == 0 and button.column == 0:
                 return button
 
         # Fallback to first in list
-        return buttons[0]
+        return first
 
     def find_button_by_keywords(
         self,
@@ -116,18 +120,36 @@ class FastButtonAnalyzer:
         if not keywords or not buttons:
             return None
 
-        # Pre-compute lowercase keywords once
-        keywords_lower = [kw.lower() for kw in keywords]
+        # One cached alternation regex: a single scan per button text
+        search = self._keyword_pattern(keywords).search
 
-        # Fast matching using pre-computed lowercase
         for button in buttons:
-            for keyword_lower in keywords_lower:
-                if button.matches_keyword(keyword_lower):
-                    logger.debug(f"Button '{button.text}' matched keyword '{keyword_lower}'")
-                    return button
+            match = search(button._text_lower)
+            if match:
+                logger.debug("Button %r matched keyword %r", button.text, match.group())
+                return button
 
         return None
 
+    def _keyword_pattern(self, keywords: List[str]) -> Pattern:
+        """Pattern for a keyword list, memoized on the raw keywords."""
+        key = tuple(keywords)
+        pattern = self._keyword_cache.get(key)
+        if pattern is None:
+            if len(self._keyword_cache) >= KEYWORD_CACHE_SIZE:
+                self._keyword_cache.clear()
+            pattern = self._compile_keywords(frozenset(kw.lower() for kw in key))
+            self._keyword_cache[key] = pattern
+        return pattern
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _compile_keywords(keywords_lower: FrozenSet[str]) -> Pattern:
+        """Cached alternation regex over lowercased keywords."""
+        # Longest first so the reported match is the most specific keyword
+        ordered = sorted(keywords_lower, key=len, reverse=True)
+        return re.compile('|'.join(map(re.escape, ordered)))
+
     def find_confirmation_button(
         self,
         buttons: List[ButtonInfo],
@@ -162,7 +184,8 @@ class FastButtonAnalyzer:
         Returns:
             Button at position or None
         """
-        # Direct iteration is faster than building a dict for small lists
+        # Direct iteration is faster than building a dict for a one-off lookup;
+        # MessageData.get_button_at_position keeps an index for repeated ones
         for button in buttons:
             if button.row == row and button.column == column:
                 return button
@@ -192,15 +215,12 @@ class FastButtonAnalyzer:
         if len(buttons1) != len(buttons2):
             return False
 
-        # Quick comparison: just check texts in order
-        # (assumes buttons maintain order, which is typical)
-        for b1, b2 in zip(buttons1, buttons2):
-            if b1.text != b2.text or b1.row != b2.row or b1.column != b2.column:
-                return False
-
-        return True
+        # Compare (text, row, column) signatures in order (assumes buttons
+        # maintain order, which is typical); attrgetter and list equality
+        # both run in C, with identity fast paths for the interned texts
+        return list(map(_signature, buttons1)) == list(map(_signature, buttons2))
 
-    def get_button_texts(self, buttons: List[ButtonInfo]) -> List[str]:
+    def get_button_texts(self, buttons: List[ButtonInfo]) -> Tuple[str, ...]:
         """
         Extract button texts efficiently.
 
@@ -208,9 +228,9 @@ class FastButtonAnalyzer:
             buttons: List of ButtonInfo objects
 
         Returns:
-            List of button texts
+            Tuple of button texts (compare against other get_button_texts results)
         """
-        return [b.text for b in buttons]
+        return tuple(b.text for b in buttons)
 
     def log_buttons(self, buttons: List[ButtonInfo], prefix: str = "") -> None:
         """
@@ -220,10 +240,14 @@ class FastButtonAnalyzer:
             buttons: List of ButtonInfo objects
             prefix: Optional prefix for log message
         """
+        # Production runs at INFO; skip joining the button texts entirely
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
         if not buttons:
-            logger.debug(f"{prefix}No buttons found")
+            logger.debug("%sNo buttons found", prefix)
             return
 
         # Build layout string efficiently
         button_texts = ', '.join([f"'{b.text}'" for b in buttons])
-        logger.debug(f"{prefix}Buttons ({len(buttons)}): {button_texts}")
+        logger.debug("%sButtons (%d): %s", prefix, len(buttons), button_texts)
@@ -1,34 +1,49 @@
 """
-Fast Button Cache - Optimized LRU cache with O(1) operations
+Fast Button Cache - Optimized CLOCK cache with O(1) operations
 """
 
 import logging
-from typing import Optional, List
-from collections import OrderedDict
-from dataclasses import dataclass
+from typing import Dict, Optional, List, Tuple
+from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageData:
     """Cached message data."""
     message_id: int
     chat_id: int
     text: str
     buttons: List  # List of ButtonInfo objects
+    # (row, column) -> button, built on the first positional lookup. Never
+    # stale: update_message stores a new MessageData for every edit
+    _position_index: Optional[Dict[Tuple[int, int], object]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def __hash__(self):
         return hash(self.message_id)
 
+    def get_button_at_position(self, row: int, column: int):
+        """Get the button at (row, column) with a single dict probe, or None."""
+        index = self._position_index
+        if index is None:
+            index = self._position_index = {(b.row, b.column): b for b in self.buttons}
+        return index.get((row, column))
+
 
 class FastButtonCache:
     """
-    Ultra-fast LRU cache for message buttons.
-    Uses OrderedDict for O(1) operations.
+    Ultra-fast CLOCK cache for message buttons.
+
+    Messages live in a fixed ring of slots with one reference bit each. A hit
+    only sets the bit; eviction sweeps the clock hand, clearing bits until it
+    finds an unreferenced slot. Approximates LRU without mutating any
+    ordering structure on reads.
     """
 
-    __slots__ = ('max_size', '_cache', '_stats', 'max_messages')
+    __slots__ = ('max_size', 'max_messages', '_slots', '_index', '_ref', '_hand', '_latest', '_stats')
 
     def __init__(self, max_size: int = 10, max_messages: int = None):
         """
@@ -40,13 +55,18 @@ class FastButtonCache:
         """
         self.max_size = max_messages if max_messages is not None else max_size
         self.max_messages = self.max_size  # Backward compatibility
-        self._cache: OrderedDict[int, MessageData] = OrderedDict()
+        self._slots: List[Optional[MessageData]] = [None] * self.max_size
+        self._index: Dict[int, int] = {}  # message_id -> slot
+        self._ref = bytearray(self.max_size)
+        self._hand = 0
+        self._latest: Optional[int] = None  # Most recently updated message_id
         self._stats = {'hits': 0, 'misses': 0, 'updates': 0}
-    
+
     @property
-    def messages_cache(self):
-        """Backward compatibility property."""
-        return self._cache
+    def messages_cache(self) -> Dict[int, MessageData]:
+        """Backward compatibility property (snapshot dict of cached messages)."""
+        slots = self._slots
+        return {message_id: slots[slot] for message_id, slot in self._index.items()}
 
     def update_message(
         self,
@@ -56,7 +76,7 @@ class FastButtonCache:
         buttons: List
     ) -> None:
         """
-        Update or add message to cache (O(1) operation).
+        Update or add message to cache (O(1) amortized).
 
         Args:
             message_id: Message ID
@@ -72,19 +92,36 @@ class FastButtonCache:
             buttons=buttons
         )
 
-        # Update cache (move to end if exists)
-        if message_id in self._cache:
-            self._cache.move_to_end(message_id)
-            self._cache[message_id] = msg_data
+        slot = self._index.get(message_id)
+        if slot is None:
+            # New messages start unreferenced: only messages read or edited
+            # again since the hand last passed survive its next sweep
+            slot = self._claim_slot()
+            self._index[message_id] = slot
         else:
-            self._cache[message_id] = msg_data
-
-            # Evict oldest if over limit
-            if len(self._cache) > self.max_size:
-                self._cache.popitem(last=False)
+            self._ref[slot] = 1
 
+        self._slots[slot] = msg_data
+        self._latest = message_id
         self._stats['updates'] += 1
 
+    def _claim_slot(self) -> int:
+        """Return a free slot, evicting the first unreferenced message if full."""
+        # Slots fill in order and are only freed by clear()
+        filled = len(self._index)
+        if filled < self.max_size:
+            return filled
+
+        ref = self._ref
+        hand = self._hand
+        while ref[hand]:
+            ref[hand] = 0
+            hand = (hand + 1) % self.max_size
+
+        del self._index[self._slots[hand].message_id]
+        self._hand = (hand + 1) % self.max_size
+        return hand
+
     def get_message(self, message_id: int) -> Optional[MessageData]:
         """
         Get message from cache (O(1) operation).
@@ -95,16 +132,16 @@ class FastButtonCache:
         Returns:
             MessageData or None
         """
-        msg_data = self._cache.get(message_id)
+        slot = self._index.get(message_id)
 
-        if msg_data:
-            self._stats['hits'] += 1
-            # Move to end (mark as recently used)
-            self._cache.move_to_end(message_id)
-        else:
+        if slot is None:
             self._stats['misses'] += 1
+            return None
 
-        return msg_data
+        self._stats['hits'] += 1
+        # Mark as recently used - a single bit, no reordering
+        self._ref[slot] = 1
+        return self._slots[slot]
 
     def get_latest_message(self) -> Optional[MessageData]:
         """
@@ -113,12 +150,8 @@ class FastButtonCache:
         Returns:
             MessageData or None
         """
-        if not self._cache:
-            return None
-
-        # Get last item (most recent)
-        message_id = next(reversed(self._cache))
-        return self._cache[message_id]
+        slot = self._index.get(self._latest)
+        return self._slots[slot] if slot is not None else None
 
     def has_message(self, message_id: int) -> bool:
         """
@@ -130,11 +163,15 @@ class FastButtonCache:
         Returns:
             True if message is cached
         """
-        return message_id in self._cache
+        return message_id in self._index
 
     def clear(self) -> None:
         """Clear the cache."""
-        self._cache.clear()
+        self._slots = [None] * self.max_size
+        self._index.clear()
+        self._ref = bytearray(self.max_size)
+        self._hand = 0
+        self._latest = None
         self._stats = {'hits': 0, 'misses': 0, 'updates': 0}
 
     def get_statistics(self) -> dict:
@@ -143,7 +180,7 @@ class FastButtonCache:
         hit_rate = (self._stats['hits'] / total_requests * 100) if total_requests > 0 else 0
 
         return {
-            'size': len(self._cache),
+            'size': len(self._index),
             'max_size': self.max_size,
             'hits': self._stats['hits'],
             'misses': self._stats['misses'],
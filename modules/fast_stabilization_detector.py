@@ -5,7 +5,7 @@ Uses monotonic clock and minimal overhead for ultra-fast detection
 
 import logging
 import asyncio
-from time import monotonic
+from time import monotonic, monotonic_ns
 from typing import Dict, Optional
 from collections import deque
 
@@ -27,7 +27,8 @@ class FastStabilizationDetector:
     Optimized for minimal overhead and maximum speed.
     """
 
-    __slots__ = ('threshold', 'strategy', '_edit_times', '_last_edits', 'max_history')
+    __slots__ = ('threshold', 'strategy', '_edit_times', '_last_edits', '_edit_events', 'max_history',
+                 '_threshold_ns', '_half_threshold_ns')
 
     def __init__(self, threshold: float = 0.15, strategy: str = 'wait', max_history: int = 20):
         """
@@ -42,9 +43,15 @@ class FastStabilizationDetector:
         self.strategy = strategy
         self.max_history = max_history
 
+        # Hot-path comparisons run on integer nanoseconds
+        self._threshold_ns = int(threshold * 1_000_000_000)
+        self._half_threshold_ns = self._threshold_ns // 2
+
         # Use dict for O(1) lookups, deque for efficient history management
         self._edit_times: Dict[int, deque] = {}
-        self._last_edits: Dict[int, float] = {}
+        self._last_edits: Dict[int, int] = {}
+        # Set on every edit of a message someone is waiting on
+        self._edit_events: Dict[int, asyncio.Event] = {}
 
     def record_edit(self, message_id: int) -> None:
         """
@@ -53,7 +60,7 @@ class FastStabilizationDetector:
         Args:
             message_id: Message ID
         """
-        current_time = monotonic()
+        current_time = monotonic_ns()
 
         # Update last edit time for fast access
         self._last_edits[message_id] = current_time
@@ -64,6 +71,11 @@ class FastStabilizationDetector:
                 self._edit_times[message_id] = deque(maxlen=self.max_history)
             self._edit_times[message_id].append(current_time)
 
+        # Wake waiters so they restart their quiet-period timer
+        event = self._edit_events.get(message_id)
+        if event is not None:
+            event.set()
+
     def is_stabilized(self, message_id: int) -> bool:
         """
         Check if message has stabilized (optimized version).
@@ -78,60 +90,91 @@ class FastStabilizationDetector:
         if last_edit is None:
             return False
 
-        time_since_last = monotonic() - last_edit
+        time_since_last = monotonic_ns() - last_edit
 
         if self.strategy == 'aggressive':
             # Ultra-aggressive: 50% of threshold
-            return time_since_last >= (self.threshold * 0.5)
+            return time_since_last >= self._half_threshold_ns
 
         elif self.strategy == 'wait':
             # Standard: full threshold
-            return time_since_last >= self.threshold
+            return time_since_last >= self._threshold_ns
 
         elif self.strategy == 'predict':
             # Predictive: analyze patterns
-            if time_since_last < self.threshold:
+            if time_since_last < self._threshold_ns:
                 return False
 
             history = self._edit_times.get(message_id)
             if not history or len(history) < 2:
-                return time_since_last >= self.threshold
-
-            # Calculate average interval
-            intervals = [history[i] - history[i-1] for i in range(1, len(history))]
-            avg_interval = sum(intervals) / len(intervals)
+                return True
 
-            # If current gap is 2x average, likely stabilized
-            return time_since_last > (avg_interval * 2)
+            # If current gap is 2x the average interval, likely stabilized.
+            # The intervals telescope, so the average is (last - first) / (n - 1);
+            # cross-multiplied to stay in integers.
+            return time_since_last * (len(history) - 1) > 2 * (history[-1] - history[0])
 
         return False
 
-    async def wait_for_stabilization(
-        self,
-        message_id: int,
-        max_wait: float = 5.0,
-        check_interval: float = 0.005  # 5ms check interval for ultra-fast response
-    ) -> bool:
+    def _time_to_stabilization(self, message_id: int) -> Optional[float]:
+        """
+        Seconds until the message counts as stabilized if no further edits
+        arrive, or None if it has no recorded edits yet.
+        """
+        last_edit = self._last_edits.get(message_id)
+        if last_edit is None:
+            return None
+
+        if self.strategy == 'aggressive':
+            quiet_period = self._half_threshold_ns
+        elif self.strategy == 'predict':
+            quiet_period = self._threshold_ns
+            history = self._edit_times.get(message_id)
+            if history and len(history) >= 2:
+                # Mirrors is_stabilized: gap must exceed 2x the average interval
+                avg_interval = (history[-1] - history[0]) // (len(history) - 1)
+                quiet_period = max(quiet_period, avg_interval * 2)
+        else:
+            quiet_period = self._threshold_ns
+
+        return (quiet_period - (monotonic_ns() - last_edit)) / 1_000_000_000
+
+    async def wait_for_stabilization(self, message_id: int, max_wait: float = 5.0) -> bool:
         """
         Wait for message to stabilize with minimal latency.
 
+        Sleeps until the quiet period would end, waking early only when a new
+        edit arrives - no polling.
+
         Args:
             message_id: Message ID to wait for
             max_wait: Maximum wait time in seconds
-            check_interval: Check interval in seconds (default 5ms)
 
         Returns:
             True if stabilized within max_wait, False if timeout
         """
         start_time = monotonic()
+        deadline = start_time + max_wait
+        event = self._edit_events.setdefault(message_id, asyncio.Event())
 
-        while (monotonic() - start_time) < max_wait:
+        while True:
             if self.is_stabilized(message_id):
-                wait_time = monotonic() - start_time
-                logger.debug(f"Message {message_id} stabilized after {wait_time*1000:.2f}ms")
+                logger.debug("Message %s stabilized after %.2fms", message_id, (monotonic() - start_time) * 1000)
                 return True
 
-            await asyncio.sleep(check_interval)
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+
+            time_left = self._time_to_stabilization(message_id)
+            # 1ms floor covers the strict comparison at the threshold edge
+            timeout = remaining if time_left is None else min(max(time_left, 0.001), remaining)
+
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
 
         logger.warning(f"Message {message_id} timeout after {max_wait}s")
         return False
@@ -147,7 +190,7 @@ class FastStabilizationDetector:
             Time in seconds or None
         """
         last_edit = self._last_edits.get(message_id)
-        return (monotonic() - last_edit) if last_edit is not None else None
+        return (monotonic_ns() - last_edit) / 1_000_000_000 if last_edit is not None else None
 
     def clear_history(self, message_id: Optional[int] = None) -> None:
         """
@@ -159,17 +202,28 @@ class FastStabilizationDetector:
         if message_id is not None:
             self._last_edits.pop(message_id, None)
             self._edit_times.pop(message_id, None)
+            self._edit_events.pop(message_id, None)
         else:
             self._last_edits.clear()
             self._edit_times.clear()
+            self._edit_events.clear()
 
     def get_statistics(self) -> dict:
         """Get detector statistics."""
-        stabilized_count = sum(1 for msg_id in self._last_edits if self.is_stabilized(msg_id))
+        # Snapshot the dicts first: this may run in a worker thread while
+        # the event loop keeps recording edits.
+        last_edits = tuple(self._last_edits.values())
+        histories = tuple(self._edit_times.values())
+
+        # One clock read for all messages; 'predict' is approximated by the
+        # plain threshold check rather than re-running the history analysis
+        now = monotonic_ns()
+        thr = self._half_threshold_ns if self.strategy == 'aggressive' else self._threshold_ns
+        stabilized_count = sum(1 for t in last_edits if now - t >= thr)
 
         return {
-            'tracked_messages': len(self._last_edits),
-            'total_edits': sum(len(h) for h in self._edit_times.values()),
+            'tracked_messages': len(last_edits),
+            'total_edits': sum(len(h) for h in histories),
             'stabilized_messages': stabilized_count,
             'strategy': self.strategy,
             'threshold_ms': self.threshold * 1000,
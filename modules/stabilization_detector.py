@@ -5,33 +5,34 @@ Detects when a message has stopped being edited.
 
 import logging
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, Optional
 from dataclasses import dataclass, field
 
 
 logger = logging.getLogger(__name__)
 
+# Edits kept per message for pattern analysis
+EDIT_HISTORY_SIZE = 20
+
 
 @dataclass
 class EditHistory:
     """History of message edits for pattern analysis."""
     message_id: int
-    edit_times: List[datetime] = field(default_factory=list)
-    last_edit: Optional[datetime] = None
+    # Monotonic timestamps; the deque drops the oldest edit once full
+    edit_times: Deque[float] = field(default_factory=lambda: deque(maxlen=EDIT_HISTORY_SIZE))
+    last_edit: Optional[float] = None
 
-    def add_edit(self, timestamp: Optional[datetime] = None) -> None:
-        """Add an edit timestamp."""
+    def add_edit(self, timestamp: Optional[float] = None) -> None:
+        """Add an edit timestamp (monotonic seconds)."""
         if timestamp is None:
-            timestamp = datetime.now()
+            timestamp = monotonic()
 
         self.edit_times.append(timestamp)
         self.last_edit = timestamp
 
-        # Keep only recent history (last 20 edits)
-        if len(self.edit_times) > 20:
-            self.edit_times = self.edit_times[-20:]
-
     def get_edit_frequency(self, time_window: float = 1.0) -> float:
         """
         Calculate edit frequency over time window.
@@ -45,11 +46,16 @@ class EditHistory:
         if not self.edit_times:
             return 0.0
 
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=time_window)
+        cutoff = monotonic() - time_window
 
-        recent_edits = [t for t in self.edit_times if t >= cutoff]
-        return len(recent_edits) / time_window
+        # Timestamps are in order, so stop at the first one outside the window
+        recent_edits = 0
+        for t in reversed(self.edit_times):
+            if t < cutoff:
+                break
+            recent_edits += 1
+
+        return recent_edits / time_window
 
     def get_average_interval(self) -> float:
         """
@@ -58,15 +64,12 @@ class EditHistory:
         Returns:
             Average interval in seconds
         """
-        if len(self.edit_times) < 2:
+        count = len(self.edit_times)
+        if count < 2:
             return 0.0
 
-        intervals = []
-        for i in range(1, len(self.edit_times)):
-            delta = (self.edit_times[i] - self.edit_times[i-1]).total_seconds()
-            intervals.append(delta)
-
-        return sum(intervals) / len(intervals) if intervals else 0.0
+        # Consecutive intervals telescope to last - first
+        return (self.edit_times[-1] - self.edit_times[0]) / (count - 1)
 
 
 class StabilizationDetector:
@@ -86,20 +89,27 @@ class StabilizationDetector:
         self.threshold = threshold
         self.strategy = strategy
         self.edit_histories: Dict[int, EditHistory] = {}
+        # Set on every edit of a message someone is waiting on
+        self._edit_events: Dict[int, asyncio.Event] = {}
 
-    def record_edit(self, message_id: int, timestamp: Optional[datetime] = None) -> None:
+    def record_edit(self, message_id: int, timestamp: Optional[float] = None) -> None:
         """
         Record a message edit (FR-3.1).
 
         Args:
             message_id: Message ID
-            timestamp: Edit timestamp (default: now)
+            timestamp: Edit timestamp from time.monotonic() (default: now)
         """
         if message_id not in self.edit_histories:
             self.edit_histories[message_id] = EditHistory(message_id=message_id)
 
         self.edit_histories[message_id].add_edit(timestamp)
 
+        # Wake waiters so they restart their quiet-period timer
+        event = self._edit_events.get(message_id)
+        if event is not None:
+            event.set()
+
     def is_stabilized(self, message_id: int) -> bool:
         """
         Check if message has stabilized (FR-3.1).
@@ -111,10 +121,10 @@ class StabilizationDetector:
             True if stabilized, False otherwise
         """
         history = self.edit_histories.get(message_id)
-        if not history or not history.last_edit:
+        if not history or history.last_edit is None:
             return False
 
-        time_since_last_edit = (datetime.now() - history.last_edit).total_seconds()
+        time_since_last_edit = monotonic() - history.last_edit
 
         if self.strategy == 'wait':
             # Simple time-based strategy (FR-3.2)
@@ -141,10 +151,10 @@ class StabilizationDetector:
             Probability of stabilization
         """
         history = self.edit_histories.get(message_id)
-        if not history or not history.last_edit:
+        if not history or history.last_edit is None:
             return 0.0
 
-        time_since_last_edit = (datetime.now() - history.last_edit).total_seconds()
+        time_since_last_edit = monotonic() - history.last_edit
 
         # Simple linear probability based on time
         if time_since_last_edit >= self.threshold:
@@ -152,29 +162,65 @@ class StabilizationDetector:
 
         return min(1.0, time_since_last_edit / self.threshold)
 
+    def _time_to_stabilization(self, message_id: int) -> Optional[float]:
+        """
+        Seconds until the message counts as stabilized if no further edits
+        arrive, or None if it has no recorded edits yet.
+        """
+        time_since_last_edit = self.get_time_since_last_edit(message_id)
+        if time_since_last_edit is None:
+            return None
+
+        if self.strategy == 'aggressive':
+            quiet_period = self.threshold * 0.5
+        elif self.strategy == 'predict':
+            # Mirrors _predict_stabilization: after the threshold, stabilized
+            # once the last second is edit-free or the gap exceeds 2x average
+            avg_interval = self.edit_histories[message_id].get_average_interval()
+            pattern_gap = min(1.0, avg_interval * 2) if avg_interval > 0 else 1.0
+            quiet_period = max(self.threshold, pattern_gap)
+        else:
+            quiet_period = self.threshold
+
+        return quiet_period - time_since_last_edit
+
     async def wait_for_stabilization(self, message_id: int,
-                                     max_wait: float = 5.0,
-                                     check_interval: float = 0.01) -> bool:
+                                     max_wait: float = 5.0) -> bool:
         """
         Wait for message to stabilize (FR-3.2).
 
+        Sleeps until the quiet period would end, waking early only when a new
+        edit arrives - no polling.
+
         Args:
             message_id: Message ID to wait for
             max_wait: Maximum wait time in seconds
-            check_interval: Check interval in seconds (default 10ms)
 
         Returns:
             True if stabilized within max_wait, False if timeout
         """
-        start_time = datetime.now()
+        start_time = monotonic()
+        deadline = start_time + max_wait
+        event = self._edit_events.setdefault(message_id, asyncio.Event())
 
-        while (datetime.now() - start_time).total_seconds() < max_wait:
+        while True:
             if self.is_stabilized(message_id):
-                wait_time = (datetime.now() - start_time).total_seconds()
-                logger.debug(f"Message {message_id} stabilized after {wait_time*1000:.1f}ms")
+                logger.debug("Message %s stabilized after %.1fms", message_id, (monotonic() - start_time) * 1000)
                 return True
 
-            await asyncio.sleep(check_interval)
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+
+            time_left = self._time_to_stabilization(message_id)
+            # 1ms floor covers the strict comparisons at the threshold edge
+            timeout = remaining if time_left is None else min(max(time_left, 0.001), remaining)
+
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
 
         logger.warning(f"Message {message_id} did not stabilize within {max_wait}s")
         return False
@@ -190,10 +236,10 @@ class StabilizationDetector:
             Time in seconds or None if no edits recorded
         """
         history = self.edit_histories.get(message_id)
-        if not history or not history.last_edit:
+        if not history or history.last_edit is None:
             return None
 
-        return (datetime.now() - history.last_edit).total_seconds()
+        return monotonic() - history.last_edit
 
     def get_edit_frequency(self, message_id: int, time_window: float = 1.0) -> float:
         """
@@ -222,8 +268,10 @@ class StabilizationDetector:
         if message_id is not None:
             if message_id in self.edit_histories:
                 del self.edit_histories[message_id]
+            self._edit_events.pop(message_id, None)
         else:
             self.edit_histories.clear()
+            self._edit_events.clear()
 
     def _predict_stabilization(self, history: EditHistory) -> bool:
         """
@@ -235,10 +283,10 @@ class StabilizationDetector:
         Returns:
             True if predicted to be stabilized
         """
-        if not history.last_edit:
+        if history.last_edit is None:
             return False
 
-        time_since_last = (datetime.now() - history.last_edit).total_seconds()
+        time_since_last = monotonic() - history.last_edit
 
         # Must have at least threshold time passed
         if time_since_last < self.threshold:
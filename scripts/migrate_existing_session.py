@@ -70,8 +70,7 @@ async def migrate_session():
     await session_manager.initialize()
 
     # Check if bot already exists
-    bots = db.get_bots_by_session(session_id)
-    bot_exists = any(bot.bot_username == bot_username for bot in bots)
+    bot_exists = bool(bot_username) and db.get_bot_by_session_and_username(session_id, bot_username) is not None
 
     if not bot_exists and bot_username:
         print(f"\n🤖 Adding bot {bot_username}...")
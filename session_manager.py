@@ -16,10 +16,21 @@ from models import Session, TargetBot
 
 logger = logging.getLogger(__name__)
 
+# Max number of sessions whose status is collected in parallel
+STATUS_CONCURRENCY = 10
+
+# Seconds between writes of buffered statistics increments
+STATS_FLUSH_INTERVAL = 2
+
 
 class AutomationInstance:
     """Represents a running automation instance for a bot"""
 
+    __slots__ = (
+        'bot_id', 'session_id', 'client', 'automation',
+        'bot_username', 'mode', 'is_active', 'created_at'
+    )
+
     def __init__(
         self,
         bot_id: int,
@@ -49,11 +60,17 @@ class SessionManager:
         self.automations: Dict[int, AutomationInstance] = {}  # bot_id -> AutomationInstance
         self.running = False
         self._health_check_task: Optional[asyncio.Task] = None
+        self._stats_flush_task: Optional[asyncio.Task] = None
+
+        # Summary counters maintained on add/remove/start/stop so status reads are O(1)
+        self._counters = {'total_sessions': 0, 'active_automations': 0}
 
     async def initialize(self):
         """Initialize the session manager"""
         logger.info("Initializing SessionManager...")
 
+        self._counters['total_sessions'] = db.count_sessions()
+
         # Load all active sessions from database
         active_sessions = db.get_all_sessions(active_only=True)
 
@@ -78,6 +95,7 @@ class SessionManager:
 
         # Start health check
         self._health_check_task = asyncio.create_task(self._health_check_loop())
+        self._stats_flush_task = asyncio.create_task(self._stats_flush_loop())
 
         logger.info("SessionManager initialized")
 
@@ -86,13 +104,14 @@ class SessionManager:
         logger.info("Shutting down SessionManager...")
         self.running = False
 
-        # Stop health check
-        if self._health_check_task:
-            self._health_check_task.cancel()
-            try:
-                await self._health_check_task
-            except asyncio.CancelledError:
-                pass
+        # Stop health check and statistics flushing
+        for task in (self._health_check_task, self._stats_flush_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
 
         # Stop all automations
         for bot_id in list(self.automations.keys()):
@@ -102,6 +121,12 @@ class SessionManager:
         for session_id in list(self.sessions.keys()):
             await self.disconnect_session(session_id)
 
+        # Write whatever increments are still buffered
+        try:
+            await asyncio.to_thread(db.flush_statistics)
+        except Exception as e:
+            logger.error(f"Failed to flush statistics: {e}")
+
         logger.info("SessionManager shut down")
 
     # ==================== Session Management ====================
@@ -130,6 +155,7 @@ class SessionManager:
 
         # Add to database
         session = db.add_session(phone, api_id, api_hash, session_file)
+        self._counters['total_sessions'] += 1
 
         logger.info(f"Added new session {session.id} for {phone}")
 
@@ -275,6 +301,7 @@ class SessionManager:
             return False
 
         db.delete_session(session_id)
+        self._counters['total_sessions'] = max(0, self._counters['total_sessions'] - 1)
         logger.info(f"Session {session_id} removed")
         return True
 
@@ -361,6 +388,7 @@ class SessionManager:
             )
             instance.is_active = True
             self.automations[bot_id] = instance
+            self._counters['active_automations'] += 1
 
             # Update database
             db.update_bot_status(bot_id, True)
@@ -386,6 +414,7 @@ class SessionManager:
 
         instance.is_active = False
         del self.automations[bot_id]
+        self._counters['active_automations'] -= 1
 
         # Update database
         db.update_bot_status(bot_id, False)
@@ -436,7 +465,7 @@ class SessionManager:
 
         for bot in bots:
             is_running = bot.id in self.automations
-            stats = db.get_statistics(bot.id)
+            stats = bot.statistics
 
             bot_statuses.append({
                 'bot_id': bot.id,
@@ -460,22 +489,34 @@ class SessionManager:
             'bots': bot_statuses
         }
 
-    def get_all_status(self) -> dict:
-        """Get status for all sessions"""
-        sessions = db.get_all_sessions()
-
-        session_statuses = []
-        for session in sessions:
-            session_statuses.append(self.get_session_status(session.id))
+    async def _session_status(self, session_id: int, semaphore: asyncio.Semaphore) -> dict:
+        """Build status for one session in a worker thread (DB calls are blocking)"""
+        async with semaphore:
+            return await asyncio.to_thread(self.get_session_status, session_id)
 
+    def get_summary(self) -> dict:
+        """Get overall counters without walking sessions and bots"""
         return {
-            'total_sessions': len(sessions),
+            'total_sessions': self._counters['total_sessions'],
             'connected_sessions': len(self.sessions),
             'total_automations': len(self.automations),
-            'active_automations': sum(1 for inst in self.automations.values() if inst.is_active),
-            'sessions': session_statuses
+            'active_automations': self._counters['active_automations'],
         }
 
+    async def get_all_status(self) -> dict:
+        """Get status for all sessions"""
+        sessions = db.get_all_sessions()
+
+        # Fetch per-session status concurrently, bounded to avoid exhausting the DB pool
+        semaphore = asyncio.Semaphore(STATUS_CONCURRENCY)
+        session_statuses = list(await asyncio.gather(
+            *(self._session_status(session.id, semaphore) for session in sessions)
+        ))
+
+        status = self.get_summary()
+        status['sessions'] = session_statuses
+        return status
+
     async def _health_check_loop(self):
         """Periodic health check for all sessions and automations"""
         while self.running:
@@ -517,6 +558,17 @@ class SessionManager:
             except Exception as e:
                 logger.error(f"Error in health check loop: {e}")
 
+    async def _stats_flush_loop(self):
+        """Periodically write buffered statistics increments"""
+        while self.running:
+            try:
+                await asyncio.sleep(STATS_FLUSH_INTERVAL)
+                await asyncio.to_thread(db.flush_statistics)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Failed to flush statistics: {e}")
+
 
 # Global session manager instance
 session_manager = SessionManager()
@@ -154,7 +154,7 @@ async def test_async_performance():
 
     # Test wait_for_stabilization
     start = monotonic()
-    result = await old_detector.wait_for_stabilization(123, max_wait=1.0, check_interval=0.001)
+    result = await old_detector.wait_for_stabilization(123, max_wait=1.0)
     old_time = (monotonic() - start) * 1000
 
     old_detector.record_edit(124)
@@ -162,7 +162,7 @@ async def test_async_performance():
     await asyncio.sleep(0.02)
 
     start = monotonic()
-    result = await new_detector.wait_for_stabilization(124, max_wait=1.0, check_interval=0.001)
+    result = await new_detector.wait_for_stabilization(124, max_wait=1.0)
     new_time = (monotonic() - start) * 1000
 
     print(f"\nwait_for_stabilization():")
@@ -183,7 +183,7 @@ Key improvements in optimized modules:
    - Uses monotonic() instead of datetime for 2-5x speedup
    - __slots__ for reduced memory footprint
    - Deque with maxlen for automatic history management
-   - Check interval reduced to 5ms (was 10ms)
+   - Event-driven waiting: wakes on edits or at the threshold, no polling
 
 2. FastButtonAnalyzer:
    - Pre-computed lowercase text for instant matching
@@ -192,8 +192,8 @@ Key improvements in optimized modules:
    - Direct iteration instead of dict builds
 
 3. FastButtonCache:
-   - OrderedDict for O(1) operations
-   - Automatic LRU eviction
+   - Fixed slot ring with O(1) lookups
+   - CLOCK eviction (hits only set a reference bit)
    - Pre-computed hash for faster lookups
 
 Expected real-world impact: